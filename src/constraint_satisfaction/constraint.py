@@ -4,7 +4,8 @@ class Constraint:
     :param Callable[[float], float] value_constraint: A function which, given the current value, evaluates how
         close/far it is from the desired value e.g. f = lambda v: v - 100, places a constraint for value
         to be below 100. If v = 120, then this will give a result which is > 0, indicating that the constraint
-        has not been satisfied.
+        has not been satisfied. A ValueConstraint (e.g. UpperBound(100)) is evaluated on arrays of values at once,
+        so it is much faster to check than a function which takes one value at a time.
     :param Tuple[float, float] time_period: defines the time period for which the given value constraint
         be satisfied
     """
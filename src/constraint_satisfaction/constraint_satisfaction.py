@@ -1,16 +1,35 @@
 import copy
+import heapq
+import itertools
 import random
 import time
 
-from math import e, ceil
+from math import e
 
 import numpy as np
+from scipy.optimize import minimize
 
+from constraint_satisfaction.evaluation_cache import EvaluationCache
+from constraint_satisfaction.mutable import VariableMutable, RegulationMutable
+from constraint_satisfaction.parallel_evaluator import ParallelEvaluator
+from constraint_satisfaction.value_constraint import ValueConstraint
+from models.network_snapshot import NetworkSnapshot
 from simulation.ode_simulator import OdeSimulator
+from simulation.parameter_sweep import ParameterSweep
+from simulation.sensitivity_analysis import SensitivityAnalysis
+from simulation.solver_backend import SolverResults
 from structured_results import StructuredResults
 
 
 class ConstraintSatisfaction:
+    # Simulations of the networks evaluated, shared by every search in the session
+    cache = EvaluationCache()
+
+    # Fraction of moves to worse assignments an adaptive annealing chain aims to accept
+    TARGET_ACCEPTANCE = 0.3
+    # How quickly an adaptive annealing chain's temperature follows its acceptance
+    ADAPTATION_RATE = 0.1
+
     # region find_network methods
 
     """
@@ -21,77 +40,364 @@ class ConstraintSatisfaction:
 
     @staticmethod
     def _evaluate_network(net, sim, constraints):
-        results = StructuredResults(OdeSimulator.simulate(net, sim), list(net.species.keys()),
-                                    sim.generate_time_space())
+        solved = ConstraintSatisfaction.cache.solve(net, sim)
+        return ConstraintSatisfaction._evaluate_results(solved, list(net.species.keys()), constraints)
+
+    """
+    :param SolverResults solved: results of a network's simulation
+    :param List[str] species: names of the network's species
+    :param List[Constraint] constraints: list of constraints to evaluate the results against
+    :returns float representing evaluating network given the constraints
+    """
+
+    @staticmethod
+    def _evaluate_results(solved, species, constraints):
+        results = StructuredResults(solved.solution, species, solved.time_space)
         total = 0
 
         for c in constraints:
             # All the simulation values in the time range
             vals = results.results_between_times(c.species, c.time_period[0], c.time_period[1])
             # All the simulation values in the time range, which do not satisfy the constraint.
-            not_sat = list(filter(lambda v: c.value_constraint(v) > 0, vals))
+            not_sat = vals[ConstraintSatisfaction._apply_constraint(c, vals) > 0]
 
-            if not_sat:
+            if len(not_sat):
                 total += c.value_constraint(np.mean(not_sat))
 
         return total
 
+    """
+    :param Constraint constraint: constraint whose value constraint to apply
+    :param np.ndarray values: values of the constraint's species
+    :returns np.ndarray of the value constraint's evaluation of each value
+    """
+
     @staticmethod
-    def _generate_next_level(net, sim, mutables, constraints):
-        level = []
+    def _apply_constraint(constraint, values):
+        if isinstance(constraint.value_constraint, ValueConstraint):
+            return constraint.value_constraint(values)
+        return np.array([constraint.value_constraint(v) for v in values], dtype=float)
+
+    """
+    Return simulation settings which end at the last time any of the constraints is checked, with the same time
+    space up to that time. The simulation after that time does not change the evaluation of a network.
+    :param SimulationSettings sim: for simulation
+    :param List[Constraint] constraints: list of constraints networks are evaluated against
+    :returns SimulationSettings ending at the last time checked
+    """
+
+    @staticmethod
+    def _get_horizon(sim, constraints):
+        horizon = copy.copy(sim)
+        if not constraints:
+            return horizon
+
+        time_space = sim.generate_time_space()
+        last = ConstraintSatisfaction._get_last_indices(time_space, constraints)
+        horizon.end_time = time_space[max(last)]
+        horizon.precision = max(last) + 1
+        return horizon
+
+    """
+    :param np.ndarray time_space: times the simulation results are given at
+    :param List[Constraint] constraints: list of constraints
+    :returns List[int] of the index of the last time each constraint is checked at, at least 1
+    """
+
+    @staticmethod
+    def _get_last_indices(time_space, constraints):
+        return [min(max(int(np.searchsorted(time_space, c.time_period[1], side="right")) - 1, 1),
+                    len(time_space) - 1)
+                for c in constraints]
+
+    """
+    :param np.ndarray time_space: times the simulation results are given at
+    :param List[Constraint] constraints: list of constraints
+    :returns List[int] of the indices of the ends of the segments _evaluate_early simulates in
+    """
+
+    @staticmethod
+    def _get_segment_ends(time_space, constraints):
+        last = ConstraintSatisfaction._get_last_indices(time_space, constraints)
+        return sorted(set(last) | {len(time_space) - 1})
+
+    """
+    Evaluate the network against the constraints while simulating it, stopping once the evaluation exceeds
+    the given bound. The simulation is split at the last time each constraint is checked, and after each
+    segment the constraints which have been checked in full are evaluated. Each constraint's evaluation is
+    assumed to be at least 0, so the evaluation so far is a lower bound of the network's evaluation.
+    :param Network net: to simulate
+    :param SimulationSettings sim: for simulation, see _get_horizon
+    :param List[Constraint] constraints: list of constraints to evaluate the network against
+    :param float bound: evaluation above which the simulation is stopped
+    :returns Tuple[SolverResults, float] of the results of the simulation, without dense output or events,
+        and the network's evaluation. If the simulation was stopped, the results are None and the evaluation
+        is that of the constraints checked so far.
+    """
+
+    @staticmethod
+    def _evaluate_early(net, sim, constraints, bound):
+        time_space = sim.generate_time_space()
+        species = list(net.species.keys())
+        last = ConstraintSatisfaction._get_last_indices(time_space, constraints)
+        ends = ConstraintSatisfaction._get_segment_ends(time_space, constraints)
+
+        segments = []
+        total = 0
+
+        for end, segment in zip(ends, OdeSimulator.solve_segments(net, sim, time_space[ends])):
+            # Each segment after the first begins with the last point of the one before
+            skip = 1 if segments else 0
+            segments.append(SolverResults(segment.time_space[skip:], segment.solution[skip:], segment.statistics))
+
+            checked = [c for c, i in zip(constraints, last) if i == end]
+            if checked:
+                solved = SolverResults(np.concatenate([r.time_space for r in segments]),
+                                       np.concatenate([r.solution for r in segments]), None)
+                total += ConstraintSatisfaction._evaluate_results(solved, species, checked)
+
+                if total > bound:
+                    return None, total
+
+        statistics = {k: sum(r.statistics[k] for r in segments) for k in segments[0].statistics}
+        results = SolverResults(np.concatenate([r.time_space for r in segments]),
+                                np.concatenate([r.solution for r in segments]), statistics)
+        return results, total
+
+    """
+    Return the evaluation of the network with each of the given assignments of the mutables. Simulations which
+    are not in the cache are run on the evaluator's processes, if an evaluator is given.
+    :param Network net: network to mutate
+    :param SimulationSettings sim: for simulation
+    :param List[List[Mutable]] assignments: assignments of the mutables, applied with Network.mutate
+    :param List[Constraint] constraints: list of constraints to evaluate the networks against
+    :param ParallelEvaluator evaluator: processes to simulate on, None to simulate in this process
+    :param float bound: if given, simulations run in this process are stopped once their evaluation exceeds
+        this or the best evaluation so far, see _evaluate_early. The evaluation of such an assignment is
+        a lower bound which exceeds the bound.
+    :returns List[float] of the evaluation of each assignment
+    """
+
+    @staticmethod
+    def _evaluate_assignments(net, sim, assignments, constraints, evaluator=None, bound=None):
+        cache = ConstraintSatisfaction.cache
+        keys = []
+        solved = {}
+        evaluations = {}
+
+        if evaluator:
+            # Applying an assignment gives the same network whatever was applied before, so the processes
+            # simulate the networks fingerprinted here
+            missing = {}
+            for node in assignments:
+                net.mutate(node)
+                key = cache.fingerprint(net, sim)
+                keys.append(key)
+                if key not in solved:
+                    solved[key] = cache.get(key)
+                    if solved[key] is None:
+                        missing[key] = node
+
+            for key, results in zip(missing, evaluator.solve(list(missing.values()))):
+                solved[key] = results
+                cache.put(key, results)
+        else:
+            # Simulations split into segments restart the solver at each boundary, so their results
+            # are kept apart from those of whole simulations
+            segments = None
+            if bound is not None:
+                ends = ConstraintSatisfaction._get_segment_ends(sim.generate_time_space(), constraints)
+                segments = ("segments", tuple(ends))
+
+            # Each network is fingerprinted and simulated as the same mutation leaves it
+            for node in assignments:
+                net.mutate(node)
+                key = cache.fingerprint(net, sim)
+                keys.append(key)
+                if key in solved:
+                    continue
+
+                stored = key + (segments,) if segments else key
+                solved[key] = cache.get(stored)
+                if solved[key] is not None:
+                    continue
+
+                if segments:
+                    solved[key], evaluations[key] = ConstraintSatisfaction._evaluate_early(net, sim, constraints,
+                                                                                           bound)
+                    bound = min(bound, evaluations[key])
+                    # Stopped simulations are not stored
+                    if solved[key] is not None:
+                        cache.put(stored, solved[key])
+                else:
+                    solved[key] = OdeSimulator.solve(net, sim)
+                    cache.put(stored, solved[key])
+
+        species = list(net.species.keys())
+        return [evaluations[key] if key in evaluations
+                else ConstraintSatisfaction._evaluate_results(solved[key], species, constraints)
+                for key in keys]
+
+    """
+    Return the network a search mutates and simulates in place of the given one: a NetworkSnapshot if the
+    mutables can be applied to one, so that trying an assignment writes a few values into arrays rather than
+    changing the network's objects, and otherwise a deep copy of the network
+    :param Network net: network to search from, not changed
+    :param List[Mutable] mutables: mutables the search changes
+    :returns NetworkSnapshot or Network to mutate
+    """
+
+    @staticmethod
+    def _get_candidate(net, mutables):
+        try:
+            return NetworkSnapshot.of(net, mutables)
+        except ValueError:
+            return copy.deepcopy(net)
+
+    """
+    Return a process pool which simulates the candidate with assignments of the mutables, see _get_candidate
+    :returns ParallelEvaluator for the candidate
+    """
+
+    @staticmethod
+    def _get_evaluator(net, candidate, sim, mutables, processes):
+        if isinstance(candidate, NetworkSnapshot):
+            return ParallelEvaluator(net, sim, processes, mutables)
+        return ParallelEvaluator(candidate, sim, processes)
+
+    """
+    :param Network net: network, not changed
+    :param List[Mutable] mutables: assignment of the mutables
+    :returns Network which is a copy of the given one, mutated with the assignment. It is the network the
+        assignment was evaluated on, since mutating does not depend on what was applied before.
+    """
+
+    @staticmethod
+    def _get_mutated(net, mutables):
+        mut_net = copy.deepcopy(net)
+        mut_net.mutate(mutables)
+        return mut_net
+
+    """
+    Return a hashable encoding of the values of the given mutables, which is equal for equal assignments
+    :param List[Mutable] mutables: mutables
+    :returns Tuple of the value of each mutable
+    """
+
+    @staticmethod
+    def _encode(mutables):
+        key = []
+        for m in mutables:
+            if isinstance(m, RegulationMutable):
+                key.append((m.is_installed, m.current_regulator, m.current_reg_type, m.k_variable.current_value))
+            else:
+                key.append(m.current_value)
+        return tuple(key)
 
+    """
+    Return each assignment of the mutables which differs from the given one by one mutable taking its next value,
+    together with the evaluation of the network with that assignment
+    :param Set[Tuple] visited: encodings of assignments already evaluated, see _encode. If given, assignments
+        in it are skipped and the rest are added to it.
+    :param ParallelEvaluator evaluator: processes to simulate on, None to simulate in this process
+    :param float bound: bound above which simulations are stopped, see _evaluate_assignments
+    :returns List[Tuple[List[Mutable], float]] of assignments and their evaluations
+    """
+
+    @staticmethod
+    def _generate_next_level(net, sim, mutables, constraints, visited=None, evaluator=None, bound=None):
         nodes = []
+
         for i in range(0, len(mutables)):
             if mutables[i].is_next():
-                node = copy.deepcopy(mutables)
+                # Only the mutable which changes is copied, the rest are shared with the given assignment
+                node = list(mutables)
+                node[i] = copy.deepcopy(mutables[i])
                 node[i].next()
-                nodes.append(node)
 
-        for node in nodes:
-            net.mutate(node)
-            eval_node = ConstraintSatisfaction._evaluate_network(net, sim, constraints)
-            level.append((node, eval_node))
+                if visited is not None:
+                    key = ConstraintSatisfaction._encode(node)
+                    if key in visited:
+                        continue
+                    visited.add(key)
+
+                nodes.append(node)
 
-        return level
+        evaluations = ConstraintSatisfaction._evaluate_assignments(net, sim, nodes, constraints, evaluator, bound)
+        return list(zip(nodes, evaluations))
 
     """
+    Best-first search through the assignments of the mutables, starting from their current values and
+    taking the next value of one mutable at a time. Each distinct assignment is simulated at most once.
     :param Network net: The network to modify
     :param SimulationSettings sim: The settings to be used to simulate the network during reverse engineering.
     :param List[Mutable] mutables: List of values which can be mutated during the constraint satisfaction process.
     :param List[Constraint] constraints: The list of constraints which the network must satisfy.
     :param int give_up_time: The time limit after which the process will stop and return None
+    :param int processes: The number of processes the assignments of each level are simulated on, None for one
+        per CPU. With more than one, the network and simulation settings must be picklable.
+    :param bool early_abort: if True, networks are simulated only up to the last time a constraint is checked,
+        and the simulation of an assignment is stopped once it evaluates worse than the best assignment found
+        so far. Stopped assignments are ordered by a lower bound of their evaluation. Assumes the evaluation of
+        every constraint is at least 0. Simulations run on other processes are not stopped.
     """
 
     @staticmethod
-    def find_network(net, sim, mutables, constraints, give_up_time):
+    def find_network(net, sim, mutables, constraints, give_up_time, processes=1, early_abort=False):
 
-        mut_net = copy.deepcopy(net)
+        candidate = ConstraintSatisfaction._get_candidate(net, mutables)
+        if early_abort:
+            sim = ConstraintSatisfaction._get_horizon(sim, constraints)
 
         # First, check whether network already satisfies constraints
-        evalCurrent = ConstraintSatisfaction._evaluate_network(mut_net, sim, constraints)
+        evalCurrent = ConstraintSatisfaction._evaluate_network(candidate, sim, constraints)
         if evalCurrent <= 0:
-            return mut_net
+            return copy.deepcopy(net)
+
+        bound = evalCurrent if early_abort else None
+        evaluator = ConstraintSatisfaction._get_evaluator(net, candidate, sim, mutables, processes) \
+            if processes != 1 else None
+        try:
+            found = ConstraintSatisfaction._best_first_search(candidate, sim, mutables, constraints,
+                                                              give_up_time, evaluator, bound)
+        finally:
+            if evaluator:
+                evaluator.close()
+
+        return ConstraintSatisfaction._get_mutated(net, found) if found is not None else None
 
-        first_level = sorted(ConstraintSatisfaction.
-                             _generate_next_level(mut_net, sim, mutables, constraints),
-                             reverse=True, key=lambda x: x[1])
+    @staticmethod
+    def _best_first_search(candidate, sim, mutables, constraints, give_up_time, evaluator, bound):
+        visited = {ConstraintSatisfaction._encode(mutables)}
+        # Entries are (evaluation, insertion order, assignment), so that the best assignment is popped first
+        # and ties are broken without comparing assignments
+        frontier = []
+        order = itertools.count()
+
+        def expand(mutables):
+            nonlocal bound
+            for node, eval_node in ConstraintSatisfaction._generate_next_level(candidate, sim, mutables, constraints,
+                                                                               visited, evaluator, bound):
+                heapq.heappush(frontier, (eval_node, next(order), node))
+                if bound is not None:
+                    bound = min(bound, eval_node)
+
+        expand(mutables)
 
         start = time.time()
 
-        stack = first_level
-        while stack:
+        while frontier:
             now = time.time()
             # Check whether the time limit has been reached
             if now - start >= give_up_time:
                 return None
 
-            (current, eval_current) = stack.pop()
+            (eval_current, _, current) = heapq.heappop(frontier)
 
             if eval_current <= 0:
-                return mut_net
+                return current
             else:
-                s = ConstraintSatisfaction._generate_next_level(mut_net, sim, current, constraints)
-                stack = sorted(stack + s, reverse=True, key=lambda x: x[1])
+                expand(current)
 
         return None
 
@@ -100,28 +406,29 @@ class ConstraintSatisfaction:
     # region find_closest_network methods
 
     """
-    :param Dict[str, Tuple[float, str]] current: current state of the network's representation used by 
-        the simulated annealing algorithm
-    :param Dict[str, Mutable] mutables: Variables which can be mutated.
-    :returns Dict[str, Tuple[float, str]] of the network state
+    Return a copy of the assignment of the mutables in which one random mutable takes its next value.
+    Only that mutable is copied, the rest are shared with the given assignment.
+    :param List[Mutable] mutables: current assignment of the mutables
+    :param random.Random rng: source of random numbers
+    :returns List[Mutable] of the neighbouring assignment, equal to the given one if no mutable has a next value
     """
 
     @staticmethod
-    def _generate_neighbour(mutables):
+    def _generate_neighbour(mutables, rng=random):
         # These are the mutables which still have not reached their upperbound value, so they are
         # available for incrementing
-        available_mutables = list(filter(lambda x: x.is_next(), list(mutables)))
+        available_mutables = [i for i, m in enumerate(mutables) if m.is_next()]
 
-        nbour = mutables.copy()
+        nbour = list(mutables)
 
         if available_mutables:
             # 1. Choose a random mutable from the mutables list
-            r = random.randrange(len(available_mutables))
-            rand_mutable = list(available_mutables)[r]
+            i = available_mutables[rng.randrange(len(available_mutables))]
 
             # 2. Increment mutable by its increment to create a new network,
             # i.e. current network's neighbour
-            rand_mutable.next()
+            nbour[i] = copy.deepcopy(mutables[i])
+            nbour[i].next()
 
         return nbour
 
@@ -129,28 +436,12 @@ class ConstraintSatisfaction:
     Return true with a probability specified by the prob parameter
 
     :param float prob: The probability that the function will return True
+    :param random.Random rng: source of random numbers
     """
 
     @staticmethod
-    def _rand_bool(prob):
-        # Since using integers for random generation, some precision of p, which is a float,
-        # will be lost (e.g. 0.387 would give 2.58397... for 1/p, and no = 3 in this case. Thus
-        # rather than the actual probability being 0.387, it will be 0.33.) To avoid this,
-        # multiply 2.58397... with precision (say, 100) to get the integer 258. In this case,
-        # each number has a probability of being picked 1/258 = 0.00387596, or the first
-        # set of 'precision' many values have a probability of 0.387596..., which is accurate
-        # to 3 decimal places.
-
-        random.seed()
-        precision = 100
-        no = ceil(1 / prob) * precision  # Total number of possible
-        rand = random.randrange(no)
-
-        # rand has a 'p' probability of being 0 <= rand < precision, thus this effectively
-        # ensures True is returned only with probability p
-        if 0 <= rand < precision:
-            return True
-        return False
+    def _rand_bool(prob, rng=random):
+        return rng.random() < prob
 
     """
     Return a schedule to be used with simulated annealing of given length starting from length, 
@@ -164,50 +455,234 @@ class ConstraintSatisfaction:
         return {z: (length - z) for z in range(0, length + 1)}
 
     """
+    Return a schedule to be used with simulated annealing of given length starting from the given temperature
+    and multiplied by the given factor at each step, ending at 0.
+
+    :param int length: The length of the produced scheduled.
+    :param float temperature: The starting temperature
+    :param float factor: The factor the temperature is multiplied by at each step, between 0 and 1
+    """
+
+    @staticmethod
+    def generate_geometric_schedule(length, temperature, factor=0.95):
+        schedule = {z: temperature * factor ** z for z in range(0, length)}
+        schedule[length] = 0
+        return schedule
+
+    """
+    Simulated annealing over the assignments of the mutables with several chains, stepped side by side, whose
+    networks are simulated together on a process pool. The chains are independent and at the temperature of
+    the schedule, unless replica exchange is enabled: then the ith chain runs at temperature_ratio ** i times
+    the schedule's temperature, and every exchange_every steps neighbouring chains swap assignments with the
+    Metropolis probability, so that good assignments found by hot chains move to colder ones.
     :param Network net: The network to modify
     :param SimulationSettings sim: The settings to be used to simulate the network during reverse engineering
     :param List[Mutable] mutables: List of values which can be mutated during the optimisation process.
     :param List[Constraint] constraints: The list of constraints which the network must satisfy.
     :param Dict[float, float] schedule: The schedule required by the simulated annealing algorithm.
+    :param int chains: The number of annealing chains
+    :param int processes: The number of processes the chains' networks are simulated on, None for one per CPU.
+        With more than one, the network and simulation settings must be picklable.
+    :param int exchange_every: The number of steps between replica exchanges, 0 for independent chains
+    :param float temperature_ratio: The ratio of the temperatures of neighbouring chains, for replica exchange
+    :param bool adaptive: If True, the temperature of each chain is adjusted as it runs, so that about
+        TARGET_ACCEPTANCE of the moves to worse assignments are accepted
+    :param int seed: seed of the random choices, None for unpredictable choices
+    :returns Network with the best assignment found by any chain
     """
 
     @staticmethod
-    def find_closest_network(net, sim, mutables, constraints, schedule):
-        mut_net = copy.deepcopy(net)
+    def find_closest_network(net, sim, mutables, constraints, schedule, chains=1, processes=1, exchange_every=0,
+                             temperature_ratio=2.0, adaptive=False, seed=None):
+        candidate = ConstraintSatisfaction._get_candidate(net, mutables)
 
         # First, check whether network already satisfies constraints
-        evalCurrent = ConstraintSatisfaction._evaluate_network(mut_net, sim, constraints)
+        evalCurrent = ConstraintSatisfaction._evaluate_network(candidate, sim, constraints)
         if evalCurrent <= 0:
-            return mut_net
+            return copy.deepcopy(net)
 
-        # Current is the set of values the mutable variables will have -> dict has the value name as key, value as value
-        current = mutables
+        evaluator = ConstraintSatisfaction._get_evaluator(net, candidate, sim, mutables, processes) \
+            if processes != 1 and chains > 1 else None
+        try:
+            best = ConstraintSatisfaction._anneal(candidate, sim, mutables, constraints, schedule, chains, evaluator,
+                                                  exchange_every, temperature_ratio, adaptive, random.Random(seed))
+        finally:
+            if evaluator:
+                evaluator.close()
 
-        for t in range(1, len(schedule) - 1):
-            T = schedule[t]
+        return ConstraintSatisfaction._get_mutated(net, best)
 
-            mut_net.mutate(current)
-            evalCurrent = ConstraintSatisfaction._evaluate_network(mut_net, sim, constraints)
+    @staticmethod
+    def _anneal(candidate, sim, mutables, constraints, schedule, chains, evaluator, exchange_every, temperature_ratio,
+                adaptive, rng):
+        # Current is the set of values the mutable variables will have, one for each chain
+        currents = [list(mutables) for _ in range(chains)]
+        evalCurrents = ConstraintSatisfaction._evaluate_assignments(candidate, sim, currents, constraints, evaluator)
+        best, evalBest = currents[0], evalCurrents[0]
 
-            if T == 0 or (evalCurrent <= 0):
-                return mut_net
-            else:
-                neighbour = ConstraintSatisfaction._generate_neighbour(mutables)
+        # Temperature of each chain relative to the schedule
+        scales = [temperature_ratio ** i if exchange_every else 1.0 for i in range(chains)]
 
-                mut_net.mutate(neighbour)
-                evalNeighbour = ConstraintSatisfaction._evaluate_network(mut_net, sim, constraints)
+        for t in range(1, len(schedule) - 1):
+            T = schedule[t]
+            if T == 0 or evalBest <= 0:
+                break
 
-                delta_e = evalCurrent - evalNeighbour
+            neighbours = [ConstraintSatisfaction._generate_neighbour(c, rng) for c in currents]
+            evalNeighbours = ConstraintSatisfaction._evaluate_assignments(candidate, sim, neighbours, constraints,
+                                                                          evaluator)
+
+            for i in range(chains):
+                # We want to minimise rather than maximise, so a move with delta_e <= 0 is always taken
+                delta_e = evalNeighbours[i] - evalCurrents[i]
 
-                # We want to minimise rather than maximise, so delta_e <= 0
                 if delta_e <= 0:
-                    current = neighbour
+                    accepted = True
                 else:
-                    p = e ** (-delta_e / T)
-                    if p > 0.000001:
-                        if ConstraintSatisfaction._rand_bool(p):
-                            current = neighbour
+                    accepted = ConstraintSatisfaction._rand_bool(e ** (-delta_e / (T * scales[i])), rng)
+                    if adaptive:
+                        scales[i] *= e ** (ConstraintSatisfaction.ADAPTATION_RATE *
+                                           (ConstraintSatisfaction.TARGET_ACCEPTANCE - accepted))
+
+                if accepted:
+                    currents[i] = neighbours[i]
+                    evalCurrents[i] = evalNeighbours[i]
+
+                    if evalCurrents[i] < evalBest:
+                        best, evalBest = currents[i], evalCurrents[i]
+
+            if exchange_every and t % exchange_every == 0:
+                # Alternate between exchanging chains 0-1, 2-3, ... and chains 1-2, 3-4, ...
+                for i in range((t // exchange_every) % 2, chains - 1, 2):
+                    j = i + 1
+                    d = (1 / (T * scales[i]) - 1 / (T * scales[j])) * (evalCurrents[i] - evalCurrents[j])
+
+                    if d >= 0 or ConstraintSatisfaction._rand_bool(e ** d, rng):
+                        currents[i], currents[j] = currents[j], currents[i]
+                        evalCurrents[i], evalCurrents[j] = evalCurrents[j], evalCurrents[i]
+
+        return best
+
+    # endregion
+
+    # region find_optimal_network methods
+
+    """
+    A smooth version of the penalty of _evaluate_network: for each constraint, the mean over its time period
+    of the squared amount by which the constraint is not satisfied
+    :param np.ndarray time_space: times of the solution
+    :param np.ndarray solution: two dimensional array where the ith row has the value of each species at time i
+    :param List[str] species: names of species, in the order of the columns of solution
+    :param List[Constraint] constraints: constraints to evaluate the solution against
+    :returns Tuple[float, np.ndarray] of the penalty and its derivative with respect to each value of solution
+    """
+
+    @staticmethod
+    def _smooth_penalty(time_space, solution, species, constraints):
+        penalty = 0.0
+        gradient = np.zeros(solution.shape)
+
+        for c in constraints:
+            in_period = slice(np.searchsorted(time_space, c.time_period[0], side="left"),
+                              np.searchsorted(time_space, c.time_period[1], side="right"))
+            i = species.index(c.species)
+            values = solution[in_period, i]
+            if not len(values):
+                continue
+
+            violations = np.maximum(ConstraintSatisfaction._apply_constraint(c, values), 0)
+
+            # Derivative of the value constraint by central differences, as it may be any function
+            h = 1e-6 * np.maximum(1, np.abs(values))
+            slopes = (ConstraintSatisfaction._apply_constraint(c, values + h) -
+                      ConstraintSatisfaction._apply_constraint(c, values - h)) / (2 * h)
+
+            penalty += np.mean(violations ** 2)
+            gradient[in_period, i] += 2 * violations * slopes / len(values)
+
+        return penalty, gradient
+
+    """
+    Minimise the smooth penalty of the constraints over the values of the mutables within their bounds with
+    L-BFGS-B, using the forward sensitivities of the network for its gradient. If the sensitivities cannot be
+    computed (e.g. a rate law cannot be differentiated), the gradient is estimated by finite differences,
+    simulating all the perturbed networks at once with OdeSimulator.solve_batch.
+
+    The values of the mutables are treated as continuous rather than stepped through by their increments.
+    Mutables without a range of values (RegulationMutable) are not optimised, but kept as they are.
+    :param Network net: The network to modify
+    :param SimulationSettings sim: The settings to be used to simulate the network during reverse engineering
+    :param List[Mutable] mutables: List of values which can be mutated during the optimisation process.
+    :param List[Constraint] constraints: The list of constraints which the network must satisfy.
+    :param int max_iterations: The most iterations of the optimiser
+    :returns Network which comes closest to satisfying the constraints
+    """
+
+    @staticmethod
+    def find_optimal_network(net, sim, mutables, constraints, max_iterations=100):
+        mut_net = copy.deepcopy(net)
+
+        # First, check whether network already satisfies constraints
+        evalCurrent = ConstraintSatisfaction._evaluate_network(mut_net, sim, constraints)
+        if evalCurrent <= 0:
+            return mut_net
 
+        mutables = copy.deepcopy(mutables)
+        # The perturbed networks of finite differences are snapshots if possible, see _get_candidate
+        candidate = ConstraintSatisfaction._get_candidate(mut_net, mutables)
+        continuous = [m for m in mutables if isinstance(m, VariableMutable)]
+        names = [ParameterSweep.get_name(m) for m in continuous]
+        species = list(mut_net.species.keys())
+        bounds = [(m.lower_bound, m.upper_bound) for m in continuous]
+
+        def apply(x):
+            for m, value in zip(continuous, x):
+                m.current_value = float(value)
+            mut_net.mutate(mutables)
+
+        def with_sensitivities(x):
+            apply(x)
+            results = SensitivityAnalysis.solve(mut_net, sim, names)
+            penalty, gradient = ConstraintSatisfaction._smooth_penalty(results.time_space, results.solution,
+                                                                       species, constraints)
+            # Chain rule through the species values at each time
+            return penalty, np.einsum("ti,tiq->q", gradient, results.sensitivities)
+
+        def with_finite_differences(x):
+            # Step inwards from the upper bounds
+            steps = 1e-6 * np.maximum(1, np.abs(x))
+            steps[x + steps > np.array([b[1] for b in bounds])] *= -1
+
+            nets = []
+            for q in range(len(x) + 1):
+                perturbed = x.copy()
+                if q:
+                    perturbed[q - 1] += steps[q - 1]
+                for m, value in zip(continuous, perturbed):
+                    m.current_value = float(value)
+                candidate.mutate(mutables)
+                nets.append(candidate.copy() if isinstance(candidate, NetworkSnapshot) else copy.deepcopy(candidate))
+
+            penalties = np.array([ConstraintSatisfaction._smooth_penalty(r.time_space, r.solution, species,
+                                                                         constraints)[0]
+                                  for r in OdeSimulator.solve_batch(nets, sim)])
+            return penalties[0], (penalties[1:] - penalties[0]) / steps
+
+        use_sensitivities = [True]
+
+        def objective(x):
+            if use_sensitivities[0]:
+                try:
+                    return with_sensitivities(x)
+                except ValueError:
+                    use_sensitivities[0] = False
+            return with_finite_differences(x)
+
+        x0 = np.array([m.current_value for m in continuous], dtype=float)
+        result = minimize(objective, x0, jac=True, method="L-BFGS-B", bounds=bounds,
+                          options={"maxiter": max_iterations})
+
+        apply(result.x)
         return mut_net
 
     # endregion
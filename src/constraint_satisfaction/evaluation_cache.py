@@ -0,0 +1,89 @@
+from collections import OrderedDict
+
+from simulation.ode_simulator import OdeSimulator
+
+
+class EvaluationCache:
+    """
+    Least recently used cache of the simulations of networks, keyed on a fingerprint of the network's species,
+    parameters and regulation together with the simulation settings. Simulations rather than evaluations
+    are stored, so they can be reused when the constraints change.
+    :param int capacity: most simulations stored, the least recently used is dropped beyond this
+    """
+
+    def __init__(self, capacity=512):
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    """
+    Return a hashable fingerprint of a network and the settings it is simulated with, which is equal
+    whenever simulating them would give the same results
+    :param Network net: network, or a NetworkSnapshot
+    :param SimulationSettings sim: simulation settings
+    :returns Tuple of the fingerprint
+    """
+
+    @staticmethod
+    def fingerprint(net, sim):
+        network = net.get_fingerprint()
+        settings = (sim.start_time, sim.end_time, sim.precision, sim.solver, sim.rtol, sim.atol,
+                    sim.adaptive_output, sim.dense_output, tuple(sim.events) if sim.events else ())
+        return network, settings
+
+    """
+    Return the stored results of the simulation with the given fingerprint
+    :param Tuple key: fingerprint, see fingerprint
+    :returns SolverResults of the simulation, which must not be changed, or None if it is not stored
+    """
+
+    def get(self, key):
+        if key in self._entries:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+        self.misses += 1
+        return None
+
+    """
+    Store the results of the simulation with the given fingerprint
+    :param Tuple key: fingerprint, see fingerprint
+    :param SolverResults results: of the simulation
+    """
+
+    def put(self, key, results):
+        self._entries[key] = results
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+
+    """
+    Return the results of simulating the network, from the cache if it was simulated before
+    :param Network net: to simulate
+    :param SimulationSettings sim: for simulation
+    :returns SolverResults of the simulation, which must not be changed
+    """
+
+    def solve(self, net, sim):
+        key = EvaluationCache.fingerprint(net, sim)
+
+        results = self.get(key)
+        if results is None:
+            results = OdeSimulator.solve(net, sim)
+            self.put(key, results)
+
+        return results
+
+    """
+    Remove every stored simulation and reset the counters
+    """
+
+    def clear(self):
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,61 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from models.network_snapshot import NetworkSnapshot
+from simulation.ode_simulator import OdeSimulator
+
+
+class ParallelEvaluator:
+    """
+    Pool of processes which simulate a network with different assignments of its mutables. The network and
+    simulation settings are sent to each process once, when it starts, and only the assignments of the
+    mutables are sent for each simulation. Both must therefore be picklable.
+    :param Network net: network to mutate and simulate, not changed
+    :param SimulationSettings sim: for simulation
+    :param int processes: number of worker processes, None for one per CPU
+    :param List[Mutable] mutables: if given, each process simulates a NetworkSnapshot of the network taken for
+        these mutables, rather than the network itself
+    """
+
+    # The network and simulation settings of a worker process
+    _net = None
+    _sim = None
+
+    def __init__(self, net, sim, processes=None, mutables=None):
+        self.processes = processes or os.cpu_count()
+        self._pool = ProcessPoolExecutor(self.processes, initializer=ParallelEvaluator._initialise,
+                                         initargs=(net, sim, mutables))
+
+    @staticmethod
+    def _initialise(net, sim, mutables):
+        # Snapshots hold compiled functions, which cannot be pickled, so each process takes its own
+        ParallelEvaluator._net = NetworkSnapshot.of(net, mutables) if mutables is not None else net
+        ParallelEvaluator._sim = sim
+
+    @staticmethod
+    def _solve(mutables):
+        ParallelEvaluator._net.mutate(mutables)
+        return OdeSimulator.solve(ParallelEvaluator._net, ParallelEvaluator._sim)
+
+    """
+    Simulate the network with each of the given assignments of its mutables, across the processes
+    :param List[List[Mutable]] assignments: assignments of the mutables, applied with Network.mutate
+    :returns List[SolverResults] of the simulation with each assignment, in the same order
+    """
+
+    def solve(self, assignments):
+        chunk_size = max(1, len(assignments) // (4 * self.processes))
+        return list(self._pool.map(ParallelEvaluator._solve, assignments, chunksize=chunk_size))
+
+    """
+    Stop the worker processes
+    """
+
+    def close(self):
+        self._pool.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,71 @@
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+
+class ValueConstraint(ABC):
+    """
+    A value constraint of a Constraint which can be applied to a NumPy array of values at once, giving the
+    evaluation of each value. As with any value constraint, an evaluation > 0 means the value does not
+    satisfy the constraint, and the larger it is the further the value is from satisfying it.
+    """
+
+    @abstractmethod
+    def __call__(self, v):
+        pass
+
+
+class UpperBound(ValueConstraint):
+    """
+    Satisfied by values at most the bound
+    :param float value: the bound
+    """
+
+    def __init__(self, value):
+        self.value = value
+
+    def __call__(self, v):
+        return v - self.value
+
+
+class LowerBound(ValueConstraint):
+    """
+    Satisfied by values at least the bound
+    :param float value: the bound
+    """
+
+    def __init__(self, value):
+        self.value = value
+
+    def __call__(self, v):
+        return self.value - v
+
+
+class Range(ValueConstraint):
+    """
+    Satisfied by values between the bounds, inclusive
+    :param float lower: the lower bound
+    :param float upper: the upper bound
+    """
+
+    def __init__(self, lower, upper):
+        self.lower = lower
+        self.upper = upper
+
+    def __call__(self, v):
+        return np.maximum(self.lower - v, v - self.upper)
+
+
+class Target(ValueConstraint):
+    """
+    Satisfied by values within the tolerance of the target
+    :param float value: the target
+    :param float tolerance: how far values may be from the target
+    """
+
+    def __init__(self, value, tolerance=0):
+        self.value = value
+        self.tolerance = tolerance
+
+    def __call__(self, v):
+        return np.abs(v - self.value) - self.tolerance
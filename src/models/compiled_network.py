@@ -0,0 +1,402 @@
+import copy
+import re
+
+import numpy as np
+from scipy.sparse import csc_matrix
+
+from models.formulae.rate_law_compiler import RateLawCompiler
+
+
+class CompiledNetwork:
+    """
+    Array representation of a Network, built once so that it can be evaluated without any dicts:
+    species are indices into a state vector, parameters indices into a parameter vector and
+    reactions the columns of a stoichiometry matrix.
+
+    :param Network net: network to compile
+    """
+
+    def __init__(self, net):
+        self.species_names = list(net.species.keys())
+        self.species_index = {s: i for i, s in enumerate(self.species_names)}
+        self.reactions = list(net.reactions)
+
+        # key: (reaction index, parameter name), or (None, symbol name) for global symbols
+        self.parameter_index = dict()
+        parameters = list()
+
+        for s in net.symbols:
+            self.parameter_index[(None, s)] = len(parameters)
+            parameters.append(net.symbols[s])
+
+        for j, r in enumerate(self.reactions):
+            for name, value in r.rate_function.get_parameter_values().items():
+                self.parameter_index[(j, name)] = len(parameters)
+                parameters.append(value)
+
+        self.parameters = np.array(parameters, dtype=float)
+        self.stoichiometry = self._build_stoichiometry()
+        # For each reaction, the (species index, change) pairs of the species it changes
+        self.change_vectors = [[(i, int(self.stoichiometry[i, j])) for i in np.nonzero(self.stoichiometry[:, j])[0]]
+                               for j in range(len(self.reactions))]
+
+        # Python expression of each reaction's rate over the state vector y and parameter vector p
+        self.expressions = list()
+        self._namespace = dict()
+        for j in range(len(self.reactions)):
+            self.expressions.append(self._get_reaction_expression(j))
+
+        # Each reaction's rate on its own, for evaluating reactions individually
+        self.rate_functions = [RateLawCompiler.compile(e, ["y", "p"], self._namespace) for e in self.expressions]
+        # Indices of the species each reaction's rate reads
+        self.dependencies = [self._get_reaction_dependencies(j) for j in range(len(self.reactions))]
+        # Entries of the Jacobian from each reaction, see _get_reaction_partials
+        self._reaction_partials = [self._get_reaction_partials(j) for j in range(len(self.reactions))]
+
+        self._link()
+
+    def _link(self):
+        # Build everything which combines the reactions, after any of them changed
+        self._rates = RateLawCompiler.compile("[{}]".format(", ".join(self.expressions)),
+                                              ["y", "p"], self._namespace)
+        self._propensities = np.zeros(len(self.reactions))
+
+        # Whether every reaction has analytic partial derivatives, so that jacobian() can be used
+        self.differentiable = self._build_jacobian()
+
+        # Whether every reaction's rate could be compiled, so that the batch methods can be used
+        self.batchable = not self._namespace
+        # Rates and partial derivatives over arrays of parameter sets, compiled when first used
+        self._batch_rates = None
+        self._batch_partials = None
+        # Partial derivatives of rates with respect to parameters, compiled when first used
+        self._parameter_partials = None
+
+    def _build_stoichiometry(self):
+        stoichiometry = np.zeros((len(self.species_names), len(self.reactions)))
+
+        for j, r in enumerate(self.reactions):
+            for x in r.left:
+                stoichiometry[self.species_index[x], j] -= 1
+            for x in r.right:
+                stoichiometry[self.species_index[x], j] += 1
+
+        return stoichiometry
+
+    def _get_resolvers(self, j):
+        def species(name):
+            return "y[{}]".format(self.species_index[name])
+
+        def parameter(name):
+            key = (j, name) if (j, name) in self.parameter_index else (None, name)
+            return "p[{}]".format(self.parameter_index[key])
+
+        return species, parameter
+
+    def _get_reaction_expression(self, j):
+        try:
+            return self.reactions[j].rate_function.get_expression(*self._get_resolvers(j))
+        except (SyntaxError, ValueError, KeyError):
+            # Cannot be compiled, so evaluate the formula on a labelled state instead
+            rate_function = self.reactions[j].rate_function
+            names = self.species_names
+
+            def rate(y, p):
+                return rate_function.compute({s: y[i] for i, s in enumerate(names)})
+
+            self._namespace["_rate_{}".format(j)] = rate
+            return "_rate_{}(y, p)".format(j)
+
+    def _get_reaction_dependencies(self, j):
+        if "_rate_{}".format(j) in self._namespace:
+            # Evaluated on the whole state, so it may read any species
+            return list(range(len(self.species_names)))
+
+        names = self.reactions[j].rate_function.get_dependencies()
+        return sorted({self.species_index[s] for s in names if s in self.species_index})
+
+    def _get_reaction_partials(self, j):
+        # J = S @ dv/dy, so every nonzero partial derivative dv_j/dy_i adds S[s, j] * dv_j/dy_i to J[s, i]
+        # for each species s changed by reaction j. Only those entries are stored, as
+        # (rows, cols, coefficients, indices into expressions, expressions), or None if there are no derivatives.
+        if "_rate_{}".format(j) in self._namespace:
+            return None
+
+        try:
+            partial_expressions = self.reactions[j].rate_function.get_partial_expressions(*self._get_resolvers(j))
+        except (SyntaxError, ValueError, KeyError):
+            return None
+
+        rows, cols, coefficients, partials = [], [], [], []
+        expressions = []
+
+        for name, expression in partial_expressions.items():
+            for s in np.nonzero(self.stoichiometry[:, j])[0]:
+                rows.append(s)
+                cols.append(self.species_index[name])
+                coefficients.append(self.stoichiometry[s, j])
+                partials.append(len(expressions))
+            expressions.append(expression)
+
+        return rows, cols, coefficients, partials, expressions
+
+    def _build_jacobian(self):
+        rows, cols, coefficients, partials = [], [], [], []
+        expressions = []
+
+        if self._namespace:  # Some reactions could not be compiled
+            return False
+
+        for reaction_partials in self._reaction_partials:
+            if reaction_partials is None:
+                return False
+
+            r_rows, r_cols, r_coefficients, r_partials, r_expressions = reaction_partials
+            rows.extend(r_rows)
+            cols.extend(r_cols)
+            coefficients.extend(r_coefficients)
+            partials.extend(len(expressions) + e for e in r_partials)
+            expressions.extend(r_expressions)
+
+        self._jacobian_rows = np.array(rows, dtype=int)
+        self._jacobian_cols = np.array(cols, dtype=int)
+        self._jacobian_coefficients = np.array(coefficients, dtype=float)
+        self._jacobian_partials = np.array(partials, dtype=int)
+        self._partial_expressions = expressions
+        self._rate_partials = RateLawCompiler.compile("[{}]".format(", ".join(expressions)), ["y", "p"])
+        return True
+
+    def _build_parameter_jacobian(self):
+        # As _build_jacobian, but with respect to the parameters each rate reads
+        rows, cols, coefficients, partials = [], [], [], []
+        expressions = []
+
+        for j, expression in enumerate(self.expressions):
+            for k in sorted({int(i) for i in re.findall(r"\bp\[(\d+)\]", expression)}):
+                partial = RateLawCompiler.differentiate(expression, "p[{}]".format(k))
+                if partial is None:
+                    continue
+
+                for s in np.nonzero(self.stoichiometry[:, j])[0]:
+                    rows.append(s)
+                    cols.append(k)
+                    coefficients.append(self.stoichiometry[s, j])
+                    partials.append(len(expressions))
+                expressions.append(partial)
+
+        self._parameter_partials = (np.array(rows, dtype=int), np.array(cols, dtype=int),
+                                    np.array(coefficients, dtype=float), np.array(partials, dtype=int),
+                                    RateLawCompiler.compile("[{}]".format(", ".join(expressions)), ["y", "p"]))
+
+    """
+    Return the nonzero entries of the Jacobian of dy_dt in the given state. Only available if differentiable is True.
+    :param np.ndarray y: state vector
+    :returns Tuple[np.ndarray, np.ndarray, np.ndarray] of rows, columns and values, where values[e] is added
+        to J[rows[e], cols[e]]. Duplicate entries are summed.
+    """
+
+    def jacobian_entries(self, y):
+        values = np.array(self._rate_partials(y.tolist(), self.parameters.tolist()), dtype=float)
+        return self._jacobian_rows, self._jacobian_cols, self._jacobian_coefficients * values[self._jacobian_partials]
+
+    """
+    Return the Jacobian of dy_dt in the given state. Only available if differentiable is True.
+    :param np.ndarray y: state vector
+    :param float t: Not used
+    :returns np.ndarray J where J[i, j] is the derivative of dy_i/dt with respect to y_j
+    """
+
+    def jacobian(self, y, t):
+        n = len(self.species_names)
+        rows, cols, values = self.jacobian_entries(y)
+        return np.bincount(rows * n + cols, values, minlength=n * n).reshape(n, n)
+
+    """
+    Return the Jacobian of dy_dt in the given state as a sparse matrix, see jacobian
+    """
+
+    def jacobian_sparse(self, y, t):
+        n = len(self.species_names)
+        rows, cols, values = self.jacobian_entries(y)
+        # Duplicate entries are summed
+        return csc_matrix((values, (rows, cols)), shape=(n, n))
+
+    """
+    Return the derivatives of dy_dt with respect to the parameters in the given state.
+    Only available if differentiable is True.
+    :param np.ndarray y: state vector
+    :param float t: Not used
+    :returns np.ndarray P where P[i, k] is the derivative of dy_i/dt with respect to parameters[k]
+    """
+
+    def parameter_jacobian(self, y, t):
+        if self._parameter_partials is None:
+            self._build_parameter_jacobian()
+
+        rows, cols, coefficients, partials, function = self._parameter_partials
+        n, m = len(self.species_names), len(self.parameters)
+        values = coefficients * np.array(function(y.tolist(), self.parameters.tolist()), dtype=float)[partials]
+        return np.bincount(rows * m + cols, values, minlength=n * m).reshape(n, m)
+
+    """
+    Return the network's initial state as a state vector
+    :param Network net: the network this was compiled from
+    :returns np.ndarray of species values, ordered as species_names
+    """
+
+    def get_state(self, net):
+        return np.array([net.species[s] for s in self.species_names], dtype=float)
+
+    """
+    Return the network's initial state as a vector of molecule counts, for stochastic simulation
+    :param Network net: the network this was compiled from
+    :returns np.ndarray of integer species counts, ordered as species_names
+    """
+
+    def get_counts(self, net):
+        return np.rint(self.get_state(net)).astype(np.int64)
+
+    """
+    Return the parameter vector of a network with the same topology as the network this was compiled from,
+    i.e. the same species, reactions and rate laws, differing only in the values of parameters
+    :param Network net: network with the same topology
+    :returns np.ndarray of parameter values, ordered as parameters
+    :raises ValueError: if the network's topology is different
+    """
+
+    def get_parameters(self, net):
+        if list(net.species.keys()) != self.species_names or len(net.reactions) != len(self.reactions):
+            raise ValueError("Network does not have the same species and reactions")
+
+        # Slots no longer used by any reaction keep their values, see update_reaction
+        parameters = self.parameters.copy()
+        try:
+            for (j, name), i in self.parameter_index.items():
+                if j is None:
+                    parameters[i] = net.symbols[name]
+
+            for j, r in enumerate(net.reactions):
+                if r.left != self.reactions[j].left or r.right != self.reactions[j].right or \
+                        r.rate_function.get_expression(*self._get_resolvers(j)) != self.expressions[j]:
+                    raise ValueError("Reaction {} is different".format(r.name))
+
+                for name, value in r.rate_function.get_parameter_values().items():
+                    parameters[self.parameter_index[(j, name)]] = value
+        except (SyntaxError, KeyError):
+            raise ValueError("Network does not have the same parameters")
+
+        return parameters
+
+    """
+    Set the value of a parameter
+    :param Tuple key: (reaction index, parameter name), or (None, symbol name), see parameter_index
+    :param float value: new value
+    :returns bool True if the parameter exists, False if it does not and nothing was changed
+    """
+
+    def set_parameter(self, key, value):
+        if key not in self.parameter_index:
+            return False
+
+        self.parameters[self.parameter_index[key]] = value
+        return True
+
+    """
+    Recompile one reaction after its rate law changed, e.g. a regulation was installed or removed, without
+    recompiling the others. The reaction's parameter values are read again; new parameters are added to
+    the end of parameters, and the slots of parameters it no longer has are kept, unused.
+    :param int j: index of the reaction
+    """
+
+    def update_reaction(self, j):
+        for name, value in self.reactions[j].rate_function.get_parameter_values().items():
+            if (j, name) not in self.parameter_index:
+                self.parameter_index[(j, name)] = len(self.parameters)
+                self.parameters = np.append(self.parameters, float(value))
+            else:
+                self.parameters[self.parameter_index[(j, name)]] = value
+
+        self._namespace.pop("_rate_{}".format(j), None)
+        self.expressions[j] = self._get_reaction_expression(j)
+        self.rate_functions[j] = RateLawCompiler.compile(self.expressions[j], ["y", "p"], self._namespace)
+        self.dependencies[j] = self._get_reaction_dependencies(j)
+        self._reaction_partials[j] = self._get_reaction_partials(j)
+
+        self._link()
+
+    """
+    Return a view of this compiled network with a different parameter vector, sharing everything else
+    :param np.ndarray parameters: parameter values, ordered as parameters
+    :returns CompiledNetwork evaluated with the given parameters
+    """
+
+    def with_parameters(self, parameters):
+        view = copy.copy(self)
+        view.parameters = parameters
+        view._propensities = np.zeros(len(self.reactions))
+        return view
+
+    """
+    Return the rate of every reaction for a batch of parameter sets
+    :param np.ndarray y: two dimensional array where y[i, k] is the value of species i for parameter set k
+    :param np.ndarray p: two dimensional array where p[i, k] is the value of parameter i in parameter set k
+    :returns np.ndarray where the [j, k] is the rate of reaction j for parameter set k
+    """
+
+    def batch_propensities(self, y, p):
+        if self._batch_rates is None:
+            self._batch_rates = RateLawCompiler.compile("[{}]".format(", ".join(self.expressions)),
+                                                        ["y", "p"], RateLawCompiler.ARRAY_FUNCTIONS)
+
+        rates = np.empty((len(self.reactions), p.shape[1]))
+        # A rate which does not depend on the state or parameters is a single number, so assign row by row
+        for j, rate in enumerate(self._batch_rates(y, p)):
+            rates[j] = rate
+        return rates
+
+    """
+    Calculate the change in the values of species for a batch of parameter sets, see batch_propensities
+    :returns np.ndarray where [i, k] is the change in species i for parameter set k
+    """
+
+    def batch_dy_dt(self, y, p):
+        return self.stoichiometry @ self.batch_propensities(y, p)
+
+    """
+    Return the nonzero entries of the Jacobian of dy_dt for a batch of parameter sets, see batch_propensities.
+    Only available if differentiable is True.
+    :returns Tuple[np.ndarray, np.ndarray, np.ndarray] of rows, columns and values, where values[e, k] is
+        added to J[rows[e], cols[e]] of the Jacobian for parameter set k. Duplicate entries are summed.
+    """
+
+    def batch_jacobian_entries(self, y, p):
+        if self._batch_partials is None:
+            self._batch_partials = RateLawCompiler.compile("[{}]".format(", ".join(self._partial_expressions)),
+                                                           ["y", "p"], RateLawCompiler.ARRAY_FUNCTIONS)
+
+        values = np.empty((len(self._partial_expressions), p.shape[1]))
+        for e, value in enumerate(self._batch_partials(y, p)):
+            values[e] = value
+
+        entries = self._jacobian_coefficients[:, None] * values[self._jacobian_partials]
+        return self._jacobian_rows, self._jacobian_cols, entries
+
+    """
+    Return the rate of every reaction in the given state
+    :param np.ndarray y: state vector
+    :returns np.ndarray of reaction rates, ordered as reactions. The same array is reused between calls.
+    """
+
+    def propensities(self, y):
+        self._propensities[:] = self._rates(y.tolist(), self.parameters.tolist())
+        return self._propensities
+
+    """
+    Calculate the change in the values of species in the given state, as odeint expects
+    :param np.ndarray y: state vector
+    :param float t: Not used
+    :returns np.ndarray of the change in each species
+    """
+
+    def dy_dt(self, y, t):
+        return self.stoichiometry @ self.propensities(y)
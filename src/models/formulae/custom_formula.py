@@ -2,6 +2,7 @@ from libsbml._libsbml import parseL3Formula
 
 import helper
 from models.formulae.formula import Formula
+from models.formulae.rate_law_compiler import RateLawCompiler
 
 
 class CustomFormula(Formula):
@@ -17,20 +18,74 @@ class CustomFormula(Formula):
         self.parameters = parameters  # Local parameters of this reaction
         self.time_multiplier = time_multiplier
 
+        # Rate function compiled into a Python function of (state, symbols), built on first use
+        self._compiled = None
+
     def compute(self, state):
-        # rate_function is str, use this function to convert to AST object.
-        rate_function_ast = parseL3Formula(self.get_formula_string())
-        eval_result = helper.safe_evaluate_ast(rate_function_ast, self.rate_function,
-                                               species=state, symbols=self.net.symbols,
-                                               parameters=self.parameters)
-        return eval_result / self.time_multiplier
+        if self._compiled is None:
+            self._compiled = self._compile()
+        return self._compiled(state, self.net.symbols)
 
     def mutate(self, mutation):
         self.parameters.update({mutation.variable_name: mutation.current_value})
+        # Parameters are folded into the compiled function as constants
+        self._compiled = None
+
+    def __getstate__(self):
+        # Compiled functions cannot be pickled, they are rebuilt on first use instead
+        state = self.__dict__.copy()
+        state["_compiled"] = None
+        return state
+
+    def _compile(self):
+        def parameter(name):
+            if name in self.parameters:
+                return repr(float(self.parameters[name]))
+            else:
+                return "symbols[{}]".format(repr(name))
+
+        try:
+            expression = self.get_expression(lambda name: "state[{}]".format(repr(name)), parameter)
+            return RateLawCompiler.compile(expression, ["state", "symbols"])
+        except (SyntaxError, ValueError):
+            # Not expressible in Python, evaluate the libsbml AST instead (parsed once only)
+            rate_function_ast = parseL3Formula(self.get_formula_string())
+
+            def evaluate(state, symbols):
+                return helper.safe_evaluate_ast(rate_function_ast, self.rate_function,
+                                                species=state, symbols=symbols,
+                                                parameters=self.parameters) / self.time_multiplier
+
+            return evaluate
 
     def get_params(self):
         return list(self.parameters.keys())
 
+    def get_parameter_values(self):
+        return dict(self.parameters)
+
+    def get_dependencies(self):
+        try:
+            names = RateLawCompiler.get_names(self.rate_function)
+        except SyntaxError:
+            # Cannot tell which species are read, so assume all of them are
+            return list(self.net.species)
+
+        return [n for n in names if n not in self.parameters and n in self.net.species]
+
+    def get_expression(self, species, parameter):
+        # Same precedence as helper.evaluate_ast: parameters, then species, then global symbols
+        def resolve_name(name):
+            if name in self.parameters:
+                return parameter(name)
+            elif name in self.net.symbols and name not in self.net.species:
+                return parameter(name)
+            else:
+                return species(name)
+
+        rate = RateLawCompiler.rewrite(self.rate_function, resolve_name)
+        return "({}) / {}".format(rate, repr(float(self.time_multiplier)))
+
     def get_formula_string(self):
         return str(self.rate_function).replace("**", "^")
 
@@ -1,5 +1,7 @@
 from abc import ABC, abstractmethod
 
+from models.formulae.rate_law_compiler import RateLawCompiler
+
 
 class Formula(ABC):
     """
@@ -28,3 +30,68 @@ class Formula(ABC):
     @staticmethod
     def get_formula_string():
         pass
+
+    """
+    Return the values of the formula's parameters, as used by get_expression
+    :returns Dict[str, float] key: parameter name, value: parameter value
+    """
+
+    @abstractmethod
+    def get_parameter_values(self):
+        pass
+
+    """
+    Return the formula as a Python expression, used to compile it into a function of arrays
+    :param Callable[[str], str] species: given a species name, returns the expression which reads its value,
+        e.g. "y[0]"
+    :param Callable[[str], str] parameter: given a parameter name, returns the expression which reads its value
+    :returns str of the expression
+    :raises SyntaxError, ValueError: if the formula cannot be expressed in Python
+    """
+
+    @abstractmethod
+    def get_expression(self, species, parameter):
+        pass
+
+    """
+    Return the names of the species whose values the formula reads
+    :returns List[str] of species names
+    """
+
+    @abstractmethod
+    def get_dependencies(self):
+        pass
+
+    """
+    Return the partial derivatives of the formula with respect to the species it depends on
+    :param Callable[[str], str] species: as for get_expression
+    :param Callable[[str], str] parameter: as for get_expression
+    :returns Dict[str, str] key: species name, value: expression of the partial derivative.
+        Species for which the derivative is zero are left out.
+    :raises SyntaxError, ValueError: if the formula cannot be expressed in Python or differentiated
+    """
+
+    def get_partial_expressions(self, species, parameter):
+        expression = self.get_expression(species, parameter)
+
+        partials = dict()
+        for s in set(self.get_dependencies()):
+            derivative = RateLawCompiler.differentiate(expression, species(s))
+            if derivative is not None:
+                partials[s] = derivative
+
+        return partials
+
+    """
+    Return a hashable fingerprint of the formula, which is equal for formulae of the same type with the same
+    structure (e.g. which species regulate a transcription, and how) and the same parameter values
+    :returns Tuple of the formula's type, structure and parameter values
+    """
+
+    def get_fingerprint(self):
+        try:
+            structure = self.get_expression(lambda name: name, lambda name: name)
+        except (SyntaxError, ValueError):
+            structure = self.get_formula_string()
+
+        return type(self).__name__, structure, tuple(sorted(self.get_parameter_values().items()))
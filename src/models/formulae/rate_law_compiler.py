@@ -0,0 +1,256 @@
+import ast
+import math
+
+import numpy as np
+
+
+class _NameResolver(ast.NodeTransformer):
+    """
+    Rewrites every name in a rate law expression into the Python expression
+    which reads its value, e.g. "A" into "state['A']".
+    :param Callable[[str], str] resolve_name: given a name, returns the Python expression replacing it
+    """
+
+    def __init__(self, resolve_name):
+        self.resolve_name = resolve_name
+
+    def visit_Name(self, node):
+        replacement = ast.parse(self.resolve_name(node.id), mode="eval").body
+        return ast.copy_location(replacement, node)
+
+    def visit_Call(self, node):
+        if not isinstance(node.func, ast.Name) or node.func.id not in RateLawCompiler.FUNCTIONS:
+            raise ValueError("Unsupported function in rate law: {}".format(ast.unparse(node.func)))
+        if node.keywords:
+            raise ValueError("Keyword arguments are not supported in rate laws")
+
+        node.args = [self.visit(a) for a in node.args]
+        return node
+
+    def generic_visit(self, node):
+        if not isinstance(node, RateLawCompiler.ALLOWED_NODES):
+            raise ValueError("Unsupported construct in rate law: {}".format(type(node).__name__))
+        return super().generic_visit(node)
+
+
+class RateLawCompiler:
+    """
+    Translates rate law expressions into Python functions, so that an expression
+    is parsed once rather than every time it is evaluated.
+
+    Expressions use Python syntax, as produced by helper.ast_to_string.
+    """
+
+    # Functions which rate laws may call, under their SBML L3 names
+    FUNCTIONS = {
+        "exp": math.exp,
+        "ln": math.log,
+        "log10": math.log10,
+        "sqrt": math.sqrt,
+        "abs": abs,
+        "pow": pow,
+        "floor": math.floor,
+        "ceil": math.ceil,
+    }
+
+    # The same functions working element-wise on arrays, for evaluating a rate law for many parameter sets at once
+    ARRAY_FUNCTIONS = {
+        "exp": np.exp,
+        "ln": np.log,
+        "log10": np.log10,
+        "sqrt": np.sqrt,
+        "abs": np.abs,
+        "pow": np.power,
+        "floor": np.floor,
+        "ceil": np.ceil,
+        "log_or_zero": lambda x: np.log(np.where(x > 0, x, 1)),
+    }
+
+    # Functions which derivatives use, besides FUNCTIONS. Rate laws cannot call these.
+    DERIVATIVE_FUNCTIONS = {
+        # ln(u), or 0 where u is not positive. In (u^v)' = u^v (v' ln(u) + v u'/u), u^v is 0 wherever
+        # ln(u) is undefined for the derivative to exist, e.g. where a Hill function's concentration is 0.
+        "log_or_zero": lambda x: math.log(x) if x > 0 else 0.0,
+    }
+
+    ALLOWED_NODES = (ast.Expression, ast.BinOp, ast.UnaryOp, ast.Constant, ast.Name, ast.Call, ast.Load,
+                     ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Pow, ast.USub, ast.UAdd)
+
+    """
+    Return the names used as variables in the given expression
+    :param str expression: rate law expression
+    :returns Set[str] of names, excluding function names
+    """
+
+    @staticmethod
+    def get_names(expression):
+        tree = ast.parse(expression, mode="eval")
+        functions = {n.func.id for n in ast.walk(tree) if isinstance(n, ast.Call) and isinstance(n.func, ast.Name)}
+        return {n.id for n in ast.walk(tree) if isinstance(n, ast.Name) and n.id not in functions}
+
+    """
+    Return the given expression with every name replaced by the Python expression reading its value
+    :param str expression: rate law expression
+    :param Callable[[str], str] resolve_name: given a name used in the expression, returns the Python
+        expression which replaces it, e.g. "state['A']" or "1.5"
+    :returns str of the rewritten expression
+    :raises SyntaxError, ValueError: if the expression is not a supported rate law
+    """
+
+    @staticmethod
+    def rewrite(expression, resolve_name):
+        tree = _NameResolver(resolve_name).visit(ast.parse(expression, mode="eval"))
+        return ast.unparse(tree.body)
+
+    """
+    Return the given Python expression compiled into a function
+    :param str source: Python expression, e.g. as returned by rewrite
+    :param List[str] arguments: names of the arguments of the compiled function
+    :param Dict[str, Any] namespace: additional globals available to the expression
+    :returns Callable of the given arguments which evaluates the expression
+    """
+
+    @staticmethod
+    def compile(source, arguments, namespace=None):
+        globals_ = dict(RateLawCompiler.FUNCTIONS)
+        globals_.update(RateLawCompiler.DERIVATIVE_FUNCTIONS)
+        if namespace:
+            globals_.update(namespace)
+
+        code = compile("lambda {}: {}".format(", ".join(arguments), source), "<rate law>", "eval")
+        return eval(code, globals_)
+
+    """
+    Return the partial derivative of the given expression with respect to a variable
+    :param str source: Python expression, e.g. as returned by rewrite
+    :param str variable: Python expression of the variable, e.g. "y[0]"
+    :returns str of the derivative's expression, None if the derivative is zero
+    :raises ValueError: if the expression contains something which cannot be differentiated
+    """
+
+    @staticmethod
+    def differentiate(source, variable):
+        tree = ast.parse(source, mode="eval").body
+        var = ast.dump(ast.parse(variable, mode="eval").body)
+
+        derivative = _Differentiator(var).derive(tree)
+        return ast.unparse(derivative) if derivative is not None else None
+
+
+class _Differentiator:
+    """
+    Symbolic differentiation of Python expression trees. None stands for a derivative of zero,
+    so that terms which do not depend on the variable are dropped rather than multiplied by zero.
+    :param str var: ast.dump of the variable to differentiate with respect to
+    """
+
+    def __init__(self, var):
+        self.var = var
+
+    def derive(self, node):
+        if isinstance(node, ast.Constant):
+            return None
+        elif isinstance(node, (ast.Name, ast.Subscript)):
+            return ast.Constant(1) if ast.dump(node) == self.var else None
+        elif isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.UAdd):
+            return self.derive(node.operand)
+        elif isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+            return _neg(self.derive(node.operand))
+        elif isinstance(node, ast.BinOp):
+            return self._derive_bin_op(node.op, node.left, node.right)
+        elif isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and not node.keywords:
+            return self._derive_call(node.func.id, node.args, node)
+
+        raise ValueError("Cannot differentiate: {}".format(ast.unparse(node)))
+
+    def _derive_bin_op(self, op, u, v):
+        du = self.derive(u)
+        dv = self.derive(v)
+
+        if isinstance(op, ast.Add):
+            return _add(du, dv)
+        elif isinstance(op, ast.Sub):
+            return _sub(du, dv)
+        elif isinstance(op, ast.Mult):
+            # (uv)' = u'v + uv'
+            return _add(_mul(du, v), _mul(u, dv))
+        elif isinstance(op, ast.Div):
+            # (u/v)' = u'/v - uv'/v^2
+            return _sub(_div(du, v), _div(_mul(u, dv), _pow(v, ast.Constant(2))))
+        elif isinstance(op, ast.Pow):
+            if dv is None:
+                # (u^v)' = v u^(v-1) u' when v is constant
+                return _mul(_mul(v, _pow(u, _sub(v, ast.Constant(1)))), du)
+            # (u^v)' = u^v (v' ln(u) + v u'/u)
+            log_u = ast.Call(ast.Name("log_or_zero", ast.Load()), [u], [])
+            return _mul(_pow(u, v), _add(_mul(dv, log_u), _div(_mul(v, du), u)))
+
+        raise ValueError("Cannot differentiate operator: {}".format(type(op).__name__))
+
+    def _derive_call(self, name, args, node):
+        if name == "pow" and len(args) == 2:
+            return self._derive_bin_op(ast.Pow(), args[0], args[1])
+        if len(args) != 1:
+            raise ValueError("Cannot differentiate: {}".format(ast.unparse(node)))
+
+        u = args[0]
+        du = self.derive(u)
+        if du is None or name in ("floor", "ceil"):
+            return None
+
+        if name == "exp":
+            return _mul(node, du)
+        elif name == "ln":
+            return _div(du, u)
+        elif name == "log10":
+            return _div(du, _mul(u, ast.Constant(math.log(10))))
+        elif name == "sqrt":
+            return _div(du, _mul(ast.Constant(2), node))
+        elif name == "abs":
+            return _mul(_div(u, node), du)
+
+        raise ValueError("Cannot differentiate function: {}".format(name))
+
+
+def _is_constant(node, value):
+    return isinstance(node, ast.Constant) and node.value == value
+
+
+def _add(a, b):
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return ast.BinOp(a, ast.Add(), b)
+
+
+def _sub(a, b):
+    if b is None:
+        return a
+    if a is None:
+        return _neg(b)
+    return ast.BinOp(a, ast.Sub(), b)
+
+
+def _neg(a):
+    return ast.UnaryOp(ast.USub(), a) if a is not None else None
+
+
+def _mul(a, b):
+    if a is None or b is None:
+        return None
+    if _is_constant(a, 1):
+        return b
+    if _is_constant(b, 1):
+        return a
+    return ast.BinOp(a, ast.Mult(), b)
+
+
+def _div(a, b):
+    if a is None:
+        return None
+    return ast.BinOp(a, ast.Div(), b)
+
+
+def _pow(a, b):
+    return ast.BinOp(a, ast.Pow(), b)
@@ -61,6 +61,66 @@ class TranscriptionFormula(Formula):
     def get_params(self):
         return ["rate", "hill_coeff"]
 
+    def get_parameter_values(self):
+        values = {"rate": self.rate}
+
+        if self.regulators:
+            values["hill_coeff"] = self.hill_coeff
+            for i, reg in enumerate(self.regulators):
+                values["k_{}".format(i)] = reg.k
+
+        return values
+
+    def get_dependencies(self):
+        return [r.from_gene for r in self.regulators] if self.regulators else []
+
+    def get_expression(self, species, parameter):
+        # Mirrors compute(), keeping the same order of operations
+        def get_single(i):
+            reg = self.regulators[i]
+            tf = species(reg.from_gene)
+            n = parameter("hill_coeff")
+            k = parameter("k_{}".format(i))
+
+            if reg.reg_type == RegType.ACTIVATION:
+                return "{} ** {} / ({} ** {} + {} ** {})".format(tf, n, k, n, tf, n)
+            else:
+                return "1 / (1 + ({} / {}) ** {})".format(tf, k, n)
+
+        def get_or_gate():
+            one = self.regulators[0]
+            two = self.regulators[1]
+            n = parameter("hill_coeff")
+
+            a = "({} / {}) ** {}".format(species(one.from_gene), parameter("k_0"), n)
+            b = "({} / {}) ** {}".format(species(two.from_gene), parameter("k_1"), n)
+            c = "(1 + {} + {})".format(a, b)
+
+            if one.reg_type == RegType.ACTIVATION and two.reg_type == RegType.ACTIVATION:
+                return "({} + {}) / {}".format(a, b, c)
+            elif one.reg_type == RegType.ACTIVATION and two.reg_type == RegType.REPRESSION:
+                return "({} + 1) / {}".format(a, c)
+            elif one.reg_type == RegType.REPRESSION and two.reg_type == RegType.ACTIVATION:
+                return "(1 + {}) / {}".format(b, c)
+            else:  # Repression, repression
+                return "1 / {}".format(c)
+
+        if not self.regulators:
+            h = "1"
+        elif len(self.regulators) == 1:
+            h = get_single(0)
+        elif len(self.regulators) == 2:
+            if self.input_gate == InputGate.AND:
+                h = "({}) * ({})".format(get_single(0), get_single(1))
+            elif self.input_gate == InputGate.OR:
+                h = get_or_gate()
+            else:
+                h = "1"
+        else:
+            h = "0"
+
+        return "({}) * {}".format(h, parameter("rate"))
+
     def get_formula_string(self):
         def get_single_activation(tf, n, k):
             a = "({}^{})".format(tf, n)
@@ -124,11 +184,7 @@ class TranscriptionFormula(Formula):
 
     def get_regulation(self, from_gene):
         if self.regulators:
-            regs = list(filter(lambda x: x.from_gene == from_gene, self.regulators))
-            if regs:
-                return regs[0]
-            else:
-                return None
+            return next((r for r in self.regulators if r.from_gene == from_gene), None)
         else:
             return None
 
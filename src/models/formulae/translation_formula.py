@@ -21,6 +21,15 @@ class TranslationFormula(Formula):
     def get_params(self):
         return ["rate"]
 
+    def get_parameter_values(self):
+        return {"rate": self.rate}
+
+    def get_dependencies(self):
+        return [self.mrna_species]
+
+    def get_expression(self, species, parameter):
+        return "{} * {}".format(parameter("rate"), species(self.mrna_species))
+
     def get_formula_string(self):
         return "{}*{}".format(self.mrna_species, str(self.rate))
 
@@ -1,4 +1,7 @@
+import copy
+
 from constraint_satisfaction.mutable import ReactionMutable, VariableMutable, RegulationMutable, GlobalParameterMutable
+from models.compiled_network import CompiledNetwork
 from models.input_gate import InputGate
 from models.regulation import Regulation
 
@@ -10,6 +13,25 @@ class Network:
         self.reactions = list()  # of Reaction
         self.symbols = dict()
 
+        # key: reaction name, value: index in reactions. Kept by add_reaction and remove_reaction,
+        # and rebuilt when found to be stale, e.g. after reactions is assigned directly.
+        self._reaction_index = dict()
+
+        # Incremented whenever the network is changed through its methods, so that anything derived from it
+        # can tell cheaply whether it is stale
+        self.version = 0
+        # The compiled network, see get_compiled, and the symbols it was compiled with
+        self._compiled = None
+        self._compiled_symbols = None
+        # (version, reactions, fingerprint of the reactions), see get_fingerprint
+        self._reactions_fingerprint = None
+
+    def __getstate__(self):
+        # The compiled network holds compiled functions, which cannot be pickled, and is compiled again when needed
+        state = self.__dict__.copy()
+        state["_compiled"] = None
+        return state
+
     """
     Change species concentrations of network using a change vector
     :param Dict[str, float] change: key: species name, value: concentration change by
@@ -20,57 +42,167 @@ class Network:
             self.species[x] += change[x]
 
     """
-    Mutate species and reactions of the network
-    :param Dict[str, Tuple[float, str]] mutations: key: mutable name, value: (new value, reaction name)
+    Mutate species and reactions of the network. The compiled network, if any, is kept up to date: changes of
+    values only update its parameters, and only the reactions whose regulation changes are recompiled.
+    Applying the same mutables gives the same network whatever mutables were applied before.
+    :param List[Mutable] mutations: mutables whose current values to apply
     """
 
     def mutate(self, mutations):
+        if self._compiled is not None and not self._is_compiled_current():
+            self._compiled = None
+
         for m in mutations:
             if isinstance(m, ReactionMutable):
-                r = self.get_reaction_by_name(m.reaction_name)
-                r.rate_function.mutate(m)
+                j = self._find_reaction(m.reaction_name)
+                self.reactions[j].rate_function.mutate(m)
+                self._update_compiled(j, m.variable_name, m.current_value)
             elif isinstance(m, GlobalParameterMutable):
                 self.symbols[m.variable_name] = m.current_value
+                self._update_compiled(None, m.variable_name, m.current_value)
             elif isinstance(m, VariableMutable):
+                # Species values are read from the network whenever it is simulated
                 self.species[m.variable_name] = m.current_value
             elif isinstance(m, RegulationMutable):
                 self._mutate_regulation(m)
 
+        self.version += 1
+
+    def _update_compiled(self, j, name, value):
+        if self._compiled is None:
+            return
+
+        if not self._compiled.set_parameter((j, name), value):
+            if j is None:  # A new symbol
+                self._compiled = None
+            else:  # A parameter the reaction's rate law does not have yet
+                self._compiled.update_reaction(j)
+
+    def _recompile_reaction(self, j):
+        if self._compiled is not None:
+            self._compiled.update_reaction(j)
+
     def _mutate_regulation(self, m):
         # Find the reaction this RegulationMutable refers to
-        # If it doesn't exist, maybe_reaction will return None
-        maybe_reaction = \
-            list(filter(lambda x: x.name == m.reaction_name, self.reactions))
+        # If it doesn't exist, j will be None
+        j = self._find_reaction(m.reaction_name)
 
-        if maybe_reaction:  # Reaction exists
+        if j is not None:  # Reaction exists
             # Get reaction's TranscriptionFormula
-            transcription = maybe_reaction[0].rate_function
+            transcription = self.reactions[j].rate_function
+
+            # The regulator species that needs to be installed, if any
+            the_regulator = m.possible_regulators[m.current_regulator] if m.is_installed else None
+
+            # Remove the regulations of the other regulators this mutable can choose from, so that the
+            # result does not depend on what was applied before
+            stale = [r for r in transcription.regulators or []
+                     if r.from_gene in m.possible_regulators and r.from_gene != the_regulator]
+            for the_regulation in stale:
+                transcription.regulators.remove(the_regulation)
+            if stale:
+                self._recompile_reaction(j)
 
             if m.is_installed:
-                # The regulator species that needs to be installed
-                the_regulator = m.possible_regulators[m.current_regulator]
                 # The regulation object which corresponds to this regulator
                 the_regulation = transcription.get_regulation(the_regulator)
 
                 if the_regulation:  # Regulation already installed, just change the parameters.
-                    the_regulation.reg_type = m.possible_reg_types[m.current_reg_type]
+                    reg_type = m.possible_reg_types[m.current_reg_type]
+                    changes_rate_law = the_regulation.reg_type != reg_type
+
+                    the_regulation.reg_type = reg_type
                     the_regulation.k = m.k_variable.current_value
+
+                    if changes_rate_law:
+                        self._recompile_reaction(j)
+                    else:
+                        k = "k_{}".format(transcription.regulators.index(the_regulation))
+                        self._update_compiled(j, k, the_regulation.k)
                 else:  # Regulation not installed, install it now.
-                    if len(transcription.regulators) == 0:
+                    if not transcription.regulators:
                         # No regulators have been installed yet, so set common regulation parameters
                         transcription.set_regulation(m.hill_coeff, [], InputGate.AND)
 
-                    new_reg = Regulation(m.possible_regulators[m.current_regulator],
+                    new_reg = Regulation(the_regulator,
                                          transcription.transcribed_species,
                                          m.possible_reg_types[m.current_reg_type],
                                          m.k_variable.current_value)
 
                     transcription.regulators.append(new_reg)
+                    self._recompile_reaction(j)
 
-            else:
-                the_regulation = transcription.get_regulation(m.current_regulator)
-                if the_regulation:
-                    transcription.regulators.remove(the_regulation)
+    """
+    Return the network compiled to arrays, see CompiledNetwork. It is compiled when first needed and then kept
+    up to date by mutate. It is compiled again if the species, symbols or reactions were changed other than by
+    mutate, e.g. assigned directly. Changes made to formulae directly are not detected.
+    :returns CompiledNetwork of the network, which must not be changed
+    """
+
+    def get_compiled(self):
+        if self._compiled is None or not self._is_compiled_current():
+            self._compiled = CompiledNetwork(self)
+            self._compiled_symbols = list(self.symbols)
+        else:
+            for s, value in self.symbols.items():
+                self._compiled.set_parameter((None, s), value)
+
+        return self._compiled
+
+    """
+    Return a copy of the network which shares its reactions and symbols, and its compiled network, so that the
+    copy is not compiled again. The copy has its own species. Changes to the reactions or symbols of either
+    network are seen by both.
+    :returns Network which is a shallow copy of the network
+    """
+
+    def copy_sharing_compiled(self):
+        compiled = self.get_compiled()
+        net = copy.copy(self)
+        net.species = dict(self.species)
+        # Copying drops the compiled network, see __getstate__
+        net._compiled = compiled
+        net._compiled_symbols = self._compiled_symbols
+        return net
+
+    def _is_compiled_current(self):
+        compiled = self._compiled
+        return compiled.species_names == list(self.species) and \
+            self._compiled_symbols == list(self.symbols) and \
+            len(compiled.reactions) == len(self.reactions) and \
+            all(a is b for a, b in zip(compiled.reactions, self.reactions))
+
+    """
+    Return a hashable fingerprint of the network's species, symbols and reactions, which is equal whenever
+    simulating the networks would give the same results. The reactions' part is kept until the network
+    changes, see version.
+    :returns Tuple of the fingerprint
+    """
+
+    def get_fingerprint(self):
+        memo = self._reactions_fingerprint
+        if memo is None or memo[0] != self.version or memo[1] is not self.reactions or \
+                len(memo[2]) != len(self.reactions):
+            reactions = tuple((r.name, tuple(r.left), tuple(r.right), r.rate_function.get_fingerprint())
+                              for r in self.reactions)
+            self._reactions_fingerprint = memo = (self.version, self.reactions, reactions)
+
+        return tuple(self.species.items()), tuple(sorted(self.symbols.items())), memo[2]
+
+    """
+    Return the index of the reaction with given name
+    :param str name: Name of reaction
+    :returns int of the index in reactions if found, None if not
+    """
+
+    def _find_reaction(self, name):
+        i = self._reaction_index.get(name)
+        if i is None or i >= len(self.reactions) or self.reactions[i].name != name:
+            # The reactions were changed other than by add_reaction or remove_reaction
+            self._reaction_index = {r.name: j for j, r in enumerate(self.reactions)}
+            i = self._reaction_index.get(name)
+
+        return i
 
     """
     Return reaction with given name
@@ -79,11 +211,47 @@ class Network:
     """
 
     def get_reaction_by_name(self, name):
-        t = list(filter(lambda r: r.name == name, self.reactions))
-        if t:
-            return t[0]
-        else:
-            return None
+        i = self._find_reaction(name)
+        return self.reactions[i] if i is not None else None
+
+    """
+    Add a reaction to the network
+    :param Reaction reaction: to add
+    """
+
+    def add_reaction(self, reaction):
+        self._reaction_index[reaction.name] = len(self.reactions)
+        self.reactions.append(reaction)
+        self.version += 1
+
+    """
+    Remove a reaction from the network
+    :param Reaction reaction: to remove
+    """
+
+    def remove_reaction(self, reaction):
+        self.reactions.remove(reaction)
+        self._reaction_index = {r.name: j for j, r in enumerate(self.reactions)}
+        self.version += 1
+
+    """
+    Add a species to the network, or change its value if it exists
+    :param str name: Name of species
+    :param float value: Value of species
+    """
+
+    def add_species(self, name, value):
+        self.species[name] = value
+        self.version += 1
+
+    """
+    Remove a species from the network
+    :param str name: Name of species
+    """
+
+    def remove_species(self, name):
+        del self.species[name]
+        self.version += 1
 
     def __str__(self):
         ret = "\nSpecies: \n"
@@ -0,0 +1,113 @@
+from constraint_satisfaction.mutable import ReactionMutable, RegulationMutable, GlobalParameterMutable
+from models.compiled_network import CompiledNetwork
+
+
+class NetworkSnapshot:
+    """
+    A network split into a compiled topology, shared by every copy of the snapshot, and the vectors of its
+    species and parameter values, which each copy owns. Copying a snapshot copies only the two vectors, and
+    mutating it writes the mutables' values into their slots. A snapshot stands in for a Network wherever a
+    network is only mutated and simulated deterministically (see OdeSimulator and EvaluationCache).
+
+    Only mutables which change values can be applied, not ones which change the topology (RegulationMutable).
+    :param CompiledNetwork compiled: the shared topology
+    :param np.ndarray state: species values, ordered as compiled.species_names
+    :param np.ndarray parameters: parameter values, ordered as compiled.parameters
+    :param Dict[Tuple, Tuple[str, int]] slots: key: mutable's binding key, value: ("state" or "parameters",
+        index of its value)
+    :param Tuple topology: hashable description of the topology, for fingerprints
+    """
+
+    def __init__(self, compiled, state, parameters, slots, topology):
+        self.compiled = compiled
+        self.state = state
+        self.parameters = parameters
+        self._slots = slots
+        self._topology = topology
+
+    """
+    Take a snapshot of the network, to which the given mutables can be applied
+    :param Network net: network, not changed
+    :param List[Mutable] mutables: mutables which will be applied to the snapshot
+    :returns NetworkSnapshot of the network's current values
+    :raises ValueError: if a rate law could not be compiled, or a mutable changes the topology or refers to
+        something the network does not have
+    """
+
+    @staticmethod
+    def of(net, mutables):
+        compiled = CompiledNetwork(net)
+        if not compiled.batchable:
+            raise ValueError("Network has rate laws which cannot be compiled")
+
+        reaction_index = {r.name: j for j, r in enumerate(compiled.reactions)}
+        slots = dict()
+
+        for m in mutables:
+            key = NetworkSnapshot._get_key(m)
+
+            if isinstance(m, RegulationMutable):
+                raise ValueError("Regulation mutables change the topology of the network")
+            elif isinstance(m, ReactionMutable):
+                index = (reaction_index.get(m.reaction_name), m.variable_name)
+                if index not in compiled.parameter_index:
+                    raise ValueError("Reaction {} has no parameter {}".format(m.reaction_name, m.variable_name))
+                slots[key] = ("parameters", compiled.parameter_index[index])
+            elif isinstance(m, GlobalParameterMutable):
+                if (None, m.variable_name) not in compiled.parameter_index:
+                    raise ValueError("Network has no symbol {}".format(m.variable_name))
+                slots[key] = ("parameters", compiled.parameter_index[(None, m.variable_name)])
+            else:
+                if m.variable_name not in compiled.species_index:
+                    raise ValueError("Network has no species {}".format(m.variable_name))
+                slots[key] = ("state", compiled.species_index[m.variable_name])
+
+        topology = (tuple(compiled.species_names), tuple(compiled.expressions), compiled.stoichiometry.tobytes())
+        return NetworkSnapshot(compiled, compiled.get_state(net), compiled.parameters.copy(), slots, topology)
+
+    @staticmethod
+    def _get_key(mutable):
+        return type(mutable), getattr(mutable, "reaction_name", None), getattr(mutable, "variable_name", None)
+
+    @property
+    def species(self):
+        return dict(zip(self.compiled.species_names, self.state.tolist()))
+
+    """
+    Return a copy of this snapshot, sharing its topology
+    :returns NetworkSnapshot with copies of the state and parameter vectors
+    """
+
+    def copy(self):
+        return NetworkSnapshot(self.compiled, self.state.copy(), self.parameters.copy(), self._slots,
+                               self._topology)
+
+    """
+    Write the values of the mutables into the state and parameter vectors, as Network.mutate does
+    :param List[Mutable] mutations: mutables the snapshot was taken for, see of
+    """
+
+    def mutate(self, mutations):
+        for m in mutations:
+            vector, i = self._slots[NetworkSnapshot._get_key(m)]
+            if vector == "state":
+                self.state[i] = m.current_value
+            else:
+                self.parameters[i] = m.current_value
+
+    """
+    Return the compiled network evaluated with this snapshot's parameters
+    :returns CompiledNetwork sharing the topology
+    """
+
+    def get_compiled(self):
+        return self.compiled.with_parameters(self.parameters)
+
+    """
+    Return a hashable fingerprint of the snapshot, which is equal whenever simulating the snapshots would give
+    the same results
+    :returns Tuple of the fingerprint
+    """
+
+    def get_fingerprint(self):
+        return self._topology, self.state.tobytes(), self.parameters.tobytes()
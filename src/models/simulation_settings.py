@@ -1,5 +1,9 @@
 import numpy as np
 
+from simulation.ode_solver import OdeSolver
+from simulation.recording_policy import RecordingPolicy
+from simulation.stochastic_method import StochasticMethod
+
 
 class SimulationSettings:
     """
@@ -7,14 +11,43 @@ class SimulationSettings:
     :param float end_time: of simulation
     :param int precision: how many data points in the given time period
     :param List[str] plotted_species: Which species to plot in the visualisation
+    :param OdeSolver solver: solver used for deterministic simulation
+    :param float rtol: relative tolerance of the solver, None for the solver's default
+    :param float atol: absolute tolerance of the solver, None for the solver's default
+    :param bool adaptive_output: if True, store the solution only at the steps the solver takes rather than
+        at precision many evenly spaced points. Does not apply to OdeSolver.ODEINT.
+    :param bool dense_output: if True, also return a continuous solution. Does not apply to OdeSolver.ODEINT.
+    :param List[Callable[[float, np.ndarray], float]] events: solve_ivp style event functions of (time, state)
+        whose zeros are located during simulation. Does not apply to OdeSolver.ODEINT.
+    :param StochasticMethod stochastic_method: method used for stochastic simulation
+    :param Any seed: seed for stochastic simulation (an int or a numpy SeedSequence), None for an
+        unpredictable seed. Runs with the same seed and settings give the same results.
+    :param RecordingPolicy recording: which points of a stochastic trajectory are stored. RecordingPolicy.GRID
+        uses the time space of these settings.
+    :param int record_every: for RecordingPolicy.EVERY_KTH, store every this many points
     """
 
-    def __init__(self, start_time, end_time, precision, plotted_species):
+    def __init__(self, start_time, end_time, precision, plotted_species, solver=OdeSolver.ODEINT,
+                 rtol=None, atol=None, adaptive_output=False, dense_output=False, events=None,
+                 stochastic_method=StochasticMethod.DIRECT, seed=None,
+                 recording=RecordingPolicy.ALL, record_every=1):
         self.plotted_species = plotted_species
         self.start_time = start_time
         self.end_time = end_time
         self.precision = precision
 
+        self.solver = solver
+        self.rtol = rtol
+        self.atol = atol
+        self.adaptive_output = adaptive_output
+        self.dense_output = dense_output
+        self.events = events
+
+        self.stochastic_method = stochastic_method
+        self.seed = seed
+        self.recording = recording
+        self.record_every = record_every
+
     """
     Return time space using the simulation settings
     """
@@ -0,0 +1,45 @@
+import numpy as np
+from scipy.sparse import csc_matrix
+
+
+class BlockDiagonal:
+    """
+    Block diagonal matrix whose blocks share the same positions of nonzero entries, such as the Jacobian
+    of several systems of ODEs stacked into one
+    :param np.ndarray rows: row of each entry within a block
+    :param np.ndarray cols: column of each entry within a block
+    :param np.ndarray values: two dimensional array where values[e, b] is the value of entry e in block b.
+        Duplicate entries are summed.
+    :param int n: size of each block
+    """
+
+    def __init__(self, rows, cols, values, n):
+        offsets = np.arange(values.shape[1]) * n
+        self.rows = (rows[:, None] + offsets).ravel()
+        self.cols = (cols[:, None] + offsets).ravel()
+        self.values = values.ravel()
+        self.n = n
+        self.size = n * values.shape[1]
+
+    """
+    Return the (lower, upper) bandwidth of the matrix
+    """
+
+    def get_band(self):
+        return self.n - 1, self.n - 1
+
+    """
+    Return the matrix in banded form, as used by scipy.linalg.solve_banded: M[i, j] is stored at [i - j + n - 1, j]
+    """
+
+    def banded(self):
+        height = 2 * self.n - 1
+        flat = (self.rows - self.cols + self.n - 1) * self.size + self.cols
+        return np.bincount(flat, self.values, minlength=height * self.size).reshape(height, self.size)
+
+    """
+    Return the matrix as a sparse matrix
+    """
+
+    def sparse(self):
+        return csc_matrix((self.values, (self.rows, self.cols)), shape=(self.size, self.size))
@@ -0,0 +1,24 @@
+import numpy as np
+
+
+class DependencyGraph:
+    """
+    Records, for every reaction, which reaction rates change when it fires: those of the reactions
+    reading a species that the fired reaction consumes or produces.
+    :param CompiledNetwork compiled: network to build the graph for
+    """
+
+    def __init__(self, compiled):
+        # key: species index, value: reactions whose rate reads that species
+        readers = {i: set() for i in range(len(compiled.species_names))}
+        for k, species in enumerate(compiled.dependencies):
+            for i in species:
+                readers[i].add(k)
+
+        self.dependents = list()  # of List[int], indexed by reaction
+        for j in range(len(compiled.reactions)):
+            changed = np.nonzero(compiled.stoichiometry[:, j])[0]
+            affected = set()
+            for i in changed:
+                affected.update(readers[i])
+            self.dependents.append(sorted(affected))
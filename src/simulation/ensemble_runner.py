@@ -0,0 +1,79 @@
+import copy
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from simulation.gillespie_simulator import GillespieSimulator
+
+
+class EnsembleResults:
+    """
+    Statistics of an ensemble of stochastic simulations, on a common time grid
+    :param np.ndarray time_space: the common time grid
+    :param List[str] species: names of species, in the order of the columns of the statistics
+    :param np.ndarray mean: mean of each species (columns) at each time (rows)
+    :param np.ndarray variance: variance of each species at each time
+    :param Dict[float, np.ndarray] quantiles: key: quantile, value: that quantile of each species at each time
+    """
+
+    def __init__(self, time_space, species, mean, variance, quantiles):
+        self.time_space = time_space
+        self.species = species
+        self.mean = mean
+        self.variance = variance
+        self.quantiles = quantiles
+
+
+class EnsembleRunner:
+    @staticmethod
+    def _run_chunk(net, sim, seeds, time_space):
+        samples = []
+
+        for seed in seeds:
+            # Each replicate gets its own random stream, so results do not depend on how
+            # replicates are spread over processes
+            replicate_sim = copy.copy(sim)
+            replicate_sim.seed = seed
+
+            # Only the species of the network are replaced by simulation, so the reactions and the compiled
+            # network can be shared, and the network is compiled once for the chunk
+            results = GillespieSimulator.simulate(net.copy_sharing_compiled(), replicate_sim)
+            samples.append(results.sample(time_space))
+
+        return np.array(samples)
+
+    """
+    Run replicates of a stochastic simulation of the given network across a pool of processes,
+    and return statistics of the replicates
+    :param Network net: to simulate, not changed
+    :param SimulationSettings sim: for simulation, including the stochastic method
+    :param int replicates: number of simulations to run
+    :param int seed: seed of the random streams, None for unpredictable streams
+    :param int processes: number of worker processes, None for one per CPU
+    :param List[float] quantiles: quantiles to compute
+    :param np.ndarray time_space: common time grid, by default the simulation settings' time space, or 100
+        points if the simulation settings' precision is 0
+    :returns EnsembleResults of the replicates
+    """
+
+    @staticmethod
+    def run(net, sim, replicates, seed=None, processes=None, quantiles=(0.05, 0.5, 0.95), time_space=None):
+        if time_space is None:
+            time_space = sim.generate_time_space() if sim.precision else np.linspace(sim.start_time,
+                                                                                        sim.end_time, 100)
+        species = list(net.species.keys())
+        seeds = np.random.SeedSequence(seed).spawn(replicates)
+        processes = processes or os.cpu_count()
+
+        with ProcessPoolExecutor(processes) as pool:
+            # One chunk of replicates per worker, so the network is sent to each worker only once
+            chunks = np.array_split(np.arange(replicates), processes)
+            futures = [pool.submit(EnsembleRunner._run_chunk, net, sim, [seeds[i] for i in chunk], time_space)
+                       for chunk in chunks if len(chunk)]
+            samples = np.concatenate([f.result() for f in futures])
+
+        return EnsembleResults(time_space, species,
+                               samples.mean(axis=0),
+                               samples.var(axis=0),
+                               {q: np.quantile(samples, q, axis=0) for q in quantiles})
@@ -1,129 +1,123 @@
-from math import *
-from random import *
-from typing import List, Tuple, Dict
+from math import inf
 import numpy as np
 
 import matplotlib.pyplot as plt
 
-from models.network import Network
-
-SimulationResults = List[Tuple[float, Dict[str, float]]]
+from simulation.dependency_graph import DependencyGraph
+from simulation.next_reaction_simulator import NextReactionSimulator
+from simulation.propensity_tree import PropensityTree
+from simulation.random_stream import RandomStream
+from simulation.stochastic_method import StochasticMethod
+from simulation.tau_leaping_simulator import TauLeapingSimulator
+from simulation.trajectory_recorder import TrajectoryRecorder
 
 
 class GillespieSimulator:
+    # From this many reactions on, reactions are picked with a PropensityTree rather than a cumulative sum
+    TREE_THRESHOLD = 1000
 
     @staticmethod
-    def _calculate_r0(net):
-        """
-        Calculate the sum of all reactions rates in the given network
-        :param Network net: Network
-        """
-
-        r0 = 0
-        for reaction in net.reactions:
-            t = reaction.rate(net.species)
-            r0 += t
-
-        return r0
-
-    @staticmethod
-    def _get_delta_time(r0):
+    def _get_delta_time(r0, stream):
         """
         Calculate the time after which the next random reaction will occur
         :param float r0: sum of all reaction rates
-        :returns float of time for the next random reaction
+        :param RandomStream stream: to draw the exponentially distributed waiting time from
+        :returns float of time for the next random reaction, inf if no reaction can occur
         """
 
-        s1 = random()  # To pick time
-        epsilon = 0.001  # To avoid division by zero
-        lam = (1 / (r0 + epsilon))
-        return lam * pow(e, -lam * s1)
+        if r0 <= 0:
+            return inf
+        return stream.exponential(r0)
 
-    @staticmethod
-    def _apply_change_vector(state, change):
-        """
-        Adds a given change vector to the network's state vector
-        :param Dict[str, float] state: Current network state
-        :param Dict[str, float] change: Change vector
-        :returns Dict[str, float] of new network state
-        """
-
-        ret = state.copy()
-        for x in state:
-            ret[x] = state[x] + change[x]
-        return ret
-
-    @staticmethod
-    def _get_next_state(net, r0):
-        """
-        Return the next state of the network after a random reaction has occurred
-        :param Network net: network for which to get next state
-        :param float r0: total of reaction propensities
-        :returns next network state
-        """
-
-        vj = GillespieSimulator._pick_next_reaction(net, r0)
-        return GillespieSimulator._apply_change_vector(net.species, vj) if vj else net.species
-
-    @staticmethod
-    def _pick_weighted_random(items, probabilities):
-        i = np.random.choice(len(items), 1, p=probabilities)
-        return items[i[0]]
+    """
+    Performs a stochastic simulation of the given network in the given
+    interval (dictated by the simulation setting given), with the method
+    chosen in the simulation settings, and returns the results.
+    :param Network net: to simulate
+    :param SimulationSettings sim: for simulation
+    :returns StochasticResults of the simulation
+    """
 
     @staticmethod
-    def _pick_next_reaction(net, r0):
-        """
-        returns a Dict[str, float] representing the
-        change vector of the reaction chosen randomly,
-        which will happen next
-        :param Network net: network for which to pick next reaction
-        :param float r0: total reaction propensities
-        :returns Dict[str, float] of change vector of picked reaction
-        """
-
-        propensities = []
-        for reaction in net.reactions:
-            try:
-                div_result = reaction.rate(net.species) / r0
-            except ZeroDivisionError:
-                div_result = reaction.rate(net.species) / 1
-            propensities.append(div_result)
-
-        random_reaction = GillespieSimulator._pick_weighted_random(net.reactions, propensities)
-        return random_reaction.change_vector(net.species)
+    def simulate(net, sim):
+        if sim.stochastic_method == StochasticMethod.NEXT_REACTION:
+            return NextReactionSimulator.simulate(net, sim)
+        elif sim.stochastic_method == StochasticMethod.TAU_LEAPING:
+            return TauLeapingSimulator.simulate(net, sim)
+        else:
+            return GillespieSimulator.simulate_direct(net, sim)
 
     """
     Performs a Gillespie simulation of the given network in the given
     interval (dictated by the simulation setting given) and returns
-    a list of results.
+    the results.
+    
+    Reaction propensities are kept between steps. When a reaction fires, only the
+    propensities of the reactions which depend on the species it changed are recomputed.
+    Random numbers come from a RandomStream seeded with the simulation settings' seed.
     :param Network net: to simulate
     :param SimulationSettings sim: for simulation
-    :returns SimulationResults of the simulation
+    :returns StochasticResults of the simulation
     """
 
     @staticmethod
-    def simulate(net, sim):
-        t = 0
-        results = []
+    def simulate_direct(net, sim):
+        compiled = net.get_compiled()
+        dependents = DependencyGraph(compiled).dependents
+        changes = compiled.change_vectors
+        rates = compiled.rate_functions
+        names = compiled.species_names
 
-        while t <= int(sim.end_time):
-            r0 = GillespieSimulator._calculate_r0(net)
+        state = compiled.get_counts(net)
+        parameters = compiled.parameters.tolist()
+        propensities = np.array([rate(state, parameters) for rate in rates], dtype=float)
 
-            delta_time = GillespieSimulator._get_delta_time(r0)
+        stream = RandomStream(sim.seed)
+        tree = PropensityTree(propensities) if len(rates) >= GillespieSimulator.TREE_THRESHOLD else None
+
+        t = 0
+        recorder = TrajectoryRecorder.from_settings(names, sim)
+        recorder.record(t, state)
+
+        while True:
+            if tree:
+                r0 = tree.total()
+            else:
+                cumulative = np.cumsum(propensities)
+                r0 = cumulative[-1] if len(cumulative) else 0
+
+            delta_time = GillespieSimulator._get_delta_time(r0, stream)
+            # No reaction can fire any more, or the next one would happen after the end time
+            if t + delta_time >= sim.end_time:
+                break
             # Advance time
             t = t + delta_time
-            # Apply one reaction chosen randomly
-            net.species = GillespieSimulator._get_next_state(net, r0)
 
-            results.append((t, net.species))
+            # Apply one reaction chosen randomly, with probability proportional to its propensity
+            u = stream.uniform() * r0
+            if tree:
+                j = tree.search(u)
+            else:
+                j = min(int(np.searchsorted(cumulative, u, side="right")), len(rates) - 1)
+
+            for i, change in changes[j]:
+                state[i] += change
+            for k in dependents[j]:
+                propensities[k] = rates[k](state, parameters)
+                if tree:
+                    tree.update(k, propensities[k])
 
-        return results
+            recorder.record(t, state)
+
+        recorder.record(sim.end_time, state)
+        net.species = dict(zip(names, state.tolist()))
+        return recorder.get_results()
 
     """
     Visualises a given set of Gillespie simulation results where
     simulation properties are dictated by the given simulation settings
     object
-    :param SimulationResults results: to be visualised
+    :param StochasticResults results: to be visualised
     :param SimulationSettings sim: for the visualisation
     """
 
@@ -132,21 +126,8 @@ class GillespieSimulator:
         # plot results
         plt.figure()
 
-        times = []
-        plottings = {}
-
-        # species: (species title, species name)
-        for species in sim.plotted_species:
-            plottings[species] = []
-
-        for x in results:
-            times.append(x[0])
-
-            for species in sim.plotted_species:
-                plottings[species].append(x[1][species])
-
         for species in sim.plotted_species:
-            plt.plot(times, plottings[species], label=species)
+            plt.plot(results.times, results.get_species(species), label=species)
 
         plt.xlabel("Time (s)")
         plt.ylabel("Concentration")
@@ -0,0 +1,66 @@
+class IndexedPriorityQueue:
+    """
+    Binary min-heap over the items 0..n-1, which keeps track of where each item is in the heap
+    so that an item's key can be changed in O(log n).
+    :param List[float] keys: initial key of each item
+    """
+
+    def __init__(self, keys):
+        self.keys = list(keys)
+        self.heap = list(range(len(self.keys)))  # of item, heap ordered by key
+        self.position = list(range(len(self.keys)))  # position[item] is the index of item in heap
+
+        for i in reversed(range(len(self.heap) // 2)):
+            self._sift_down(i)
+
+    """
+    Return the item with the smallest key, and its key
+    :returns Tuple[int, float] of (item, key)
+    """
+
+    def top(self):
+        item = self.heap[0]
+        return item, self.keys[item]
+
+    """
+    Change the key of the given item
+    :param int item: item to update
+    :param float key: new key of the item
+    """
+
+    def update(self, item, key):
+        old = self.keys[item]
+        self.keys[item] = key
+
+        if key < old:
+            self._sift_up(self.position[item])
+        else:
+            self._sift_down(self.position[item])
+
+    def _swap(self, i, j):
+        heap = self.heap
+        heap[i], heap[j] = heap[j], heap[i]
+        self.position[heap[i]] = i
+        self.position[heap[j]] = j
+
+    def _sift_up(self, i):
+        while i > 0:
+            parent = (i - 1) // 2
+            if self.keys[self.heap[i]] >= self.keys[self.heap[parent]]:
+                break
+            self._swap(i, parent)
+            i = parent
+
+    def _sift_down(self, i):
+        n = len(self.heap)
+
+        while True:
+            smallest = i
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < n and self.keys[self.heap[child]] < self.keys[self.heap[smallest]]:
+                    smallest = child
+
+            if smallest == i:
+                break
+            self._swap(i, smallest)
+            i = smallest
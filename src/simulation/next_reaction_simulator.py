@@ -0,0 +1,98 @@
+from math import inf
+
+from simulation.dependency_graph import DependencyGraph
+from simulation.indexed_priority_queue import IndexedPriorityQueue
+from simulation.random_stream import RandomStream
+from simulation.trajectory_recorder import TrajectoryRecorder
+
+"""
+Gibson-Bruck Next Reaction Method: every reaction keeps a putative time at which it next fires,
+in an indexed priority queue. The next reaction is the one with the earliest time, found in O(1),
+and after it fires only the times of the reactions depending on it are updated, each in O(log R).
+
+Source: Efficient Exact Stochastic Simulation of Chemical Systems with Many Species and Many
+    Channels, M. A. Gibson and J. Bruck, J. Phys. Chem. A 2000, 104, 1876-1889
+"""
+
+
+class NextReactionSimulator:
+
+    @staticmethod
+    def _get_putative_time(t, propensity, stream):
+        """
+        Return a random time at which a reaction with the given propensity next fires
+        :param float t: current time
+        :param float propensity: reaction's propensity
+        :param RandomStream stream: source of random numbers
+        :returns float of the putative time, inf if the reaction cannot fire
+        """
+
+        if propensity <= 0:
+            return inf
+        return t + stream.exponential(propensity)
+
+    @staticmethod
+    def _get_updated_time(t, old_time, old_propensity, new_propensity, stream):
+        """
+        Return a reaction's putative time rescaled after its propensity changed, without drawing
+        a new random number (Gibson and Bruck, section 3.2)
+        """
+
+        if new_propensity <= 0:
+            return inf
+        if old_propensity <= 0 or old_time == inf:
+            return NextReactionSimulator._get_putative_time(t, new_propensity, stream)
+        return t + (old_propensity / new_propensity) * (old_time - t)
+
+    """
+    Performs a stochastic simulation of the given network with the Next Reaction Method.
+    Takes the same arguments and returns results in the same format as GillespieSimulator.simulate,
+    so GillespieSimulator.visualise can be used to plot them.
+    :param Network net: to simulate
+    :param SimulationSettings sim: for simulation
+    :returns StochasticResults of the simulation
+    """
+
+    @staticmethod
+    def simulate(net, sim):
+        compiled = net.get_compiled()
+        dependents = DependencyGraph(compiled).dependents
+        changes = compiled.change_vectors
+        rates = compiled.rate_functions
+        names = compiled.species_names
+
+        state = compiled.get_counts(net)
+        parameters = compiled.parameters.tolist()
+        propensities = [rate(state, parameters) for rate in rates]
+
+        stream = RandomStream(sim.seed)
+        queue = IndexedPriorityQueue([NextReactionSimulator._get_putative_time(0, a, stream) for a in propensities])
+
+        t = 0
+        recorder = TrajectoryRecorder.from_settings(names, sim)
+        recorder.record(t, state)
+
+        while True:
+            j, t = queue.top()
+            # No reaction can fire any more, or the next one would happen after the end time
+            if t >= sim.end_time:
+                break
+
+            for i, change in changes[j]:
+                state[i] += change
+
+            for k in dependents[j]:
+                old_propensity = propensities[k]
+                propensities[k] = rates[k](state, parameters)
+                if k != j:
+                    queue.update(k, NextReactionSimulator._get_updated_time(
+                        t, queue.keys[k], old_propensity, propensities[k], stream))
+
+            # The fired reaction always draws a new time
+            queue.update(j, NextReactionSimulator._get_putative_time(t, propensities[j], stream))
+
+            recorder.record(t, state)
+
+        recorder.record(sim.end_time, state)
+        net.species = dict(zip(names, state.tolist()))
+        return recorder.get_results()
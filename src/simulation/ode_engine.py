@@ -0,0 +1,6 @@
+from enum import Enum
+
+
+class OdeEngine(Enum):
+    DICTIONARY = 1  # Evaluates reactions on a labelled dict of the state, see OdeSimulator._dy_dt
+    STOICHIOMETRY = 2  # Evaluates a CompiledNetwork, dy/dt = S @ v
@@ -1,6 +1,12 @@
+import copy
+
 import matplotlib.pyplot as plt
-from scipy.integrate import odeint
+import numpy as np
 
+from models.network_snapshot import NetworkSnapshot
+from simulation.block_diagonal import BlockDiagonal
+from simulation.ode_engine import OdeEngine
+from simulation.solver_backend import SolverBackend, SolverResults
 from structured_results import StructuredResults
 
 
@@ -35,33 +41,162 @@ class OdeSimulator:
         return list(changes.values())
 
     """
-    Simulate class network and return results
-    :returns np.ndarray of simulation results
+    Return the system of ODEs of the network
+    :param Network net: to simulate, or a NetworkSnapshot, which is always evaluated as compiled
+    :param OdeEngine engine: how the right hand side of the ODEs is evaluated
+    :returns Tuple of the right hand side, the initial state, and the Jacobian in dense and sparse form,
+        which are None if it is not available
     """
     @staticmethod
-    def simulate(net, sim):
+    def _get_system(net, engine):
+        if isinstance(net, NetworkSnapshot) or engine == OdeEngine.STOICHIOMETRY:
+            if isinstance(net, NetworkSnapshot):
+                compiled, y0 = net.get_compiled(), net.state.copy()
+            else:
+                compiled = net.get_compiled()
+                y0 = compiled.get_state(net)
+
+            # Without an analytic Jacobian, the solver estimates it by finite differences
+            if compiled.differentiable:
+                return compiled.dy_dt, y0, compiled.jacobian, compiled.jacobian_sparse
+            return compiled.dy_dt, y0, None, None
+
         # Build the initial state
         y0 = [net.species[key] for key in net.species]
 
-        # solve the ODEs
-        solution = odeint(OdeSimulator._dy_dt, y0, sim.generate_time_space(), (net,))
+        return lambda y, t: OdeSimulator._dy_dt(y, t, net), y0, None, None
+
+    """
+    Simulate network with the solver given in the simulation settings
+    :param Network net: to simulate
+    :param SimulationSettings sim: for simulation
+    :param OdeEngine engine: how the right hand side of the ODEs is evaluated
+    :returns SolverResults of the simulation, including the times the solution is given for
+    """
+    @staticmethod
+    def solve(net, sim, engine=OdeEngine.DICTIONARY):
+        dy_dt, y0, jacobian, jacobian_sparse = OdeSimulator._get_system(net, engine)
+        return SolverBackend.solve(dy_dt, y0, sim, jacobian, jacobian_sparse)
+
+    """
+    Simulate network in segments which end at the given times, yielding the results of each segment as
+    soon as it is solved, so that the caller can stop the simulation early. Each segment starts from the
+    last state of the one before, with the solver restarted, and its results begin at that state.
+    :param Network net: to simulate
+    :param SimulationSettings sim: for simulation
+    :param List[float] times: increasing end times of the segments, which should be points of the time space
+        of the simulation settings so that the segments' results are given at those points
+    :param OdeEngine engine: how the right hand side of the ODEs is evaluated
+    :returns Iterator[SolverResults] of the simulation of each segment
+    """
+    @staticmethod
+    def solve_segments(net, sim, times, engine=OdeEngine.DICTIONARY):
+        dy_dt, y0, jacobian, jacobian_sparse = OdeSimulator._get_system(net, engine)
+        step = (sim.end_time - sim.start_time) / (sim.precision - 1)
+
+        start = sim.start_time
+        for end in times:
+            segment = copy.copy(sim)
+            segment.start_time = start
+            segment.end_time = end
+            segment.precision = int(round((end - start) / step)) + 1
+
+            results = SolverBackend.solve(dy_dt, y0, segment, jacobian, jacobian_sparse)
+            yield results
 
-        return solution
+            y0 = results.solution[-1]
+            start = end
+
+    """
+    Simulate several parameterisations of the same network at once, as one stacked system of ODEs
+    whose state holds the species of every network. Each evaluation of the right hand side computes
+    the rates of all networks together with array operations.
+    
+    The networks must have the same topology (species, reactions and rate laws) and differ only in
+    parameter values and initial species values, e.g. copies of a network with different mutations.
+    As the solver takes the same steps for the whole batch, they are as small as the hardest network needs.
+    Events in the simulation settings are given the stacked state, whose kth block of len(species) values
+    belongs to the kth network.
+    :param List[Network] nets: to simulate, or snapshots of the same network (see NetworkSnapshot)
+    :param SimulationSettings sim: for simulation
+    :returns List[SolverResults] of the simulation of each network, sharing the solver statistics
+    :raises ValueError: if the networks do not have the same topology
+    """
+    @staticmethod
+    def solve_batch(nets, sim):
+        if isinstance(nets[0], NetworkSnapshot):
+            compiled = nets[0].compiled
+            # Column k holds the parameters of the kth network
+            parameters = np.column_stack([snapshot.parameters for snapshot in nets])
+            y0 = np.concatenate([snapshot.state for snapshot in nets])
+        else:
+            compiled = nets[0].get_compiled()
+            if not compiled.batchable:
+                return [OdeSimulator.solve(net, sim, OdeEngine.STOICHIOMETRY) for net in nets]
+
+            parameters = np.column_stack([compiled.get_parameters(net) for net in nets])
+            y0 = np.concatenate([compiled.get_state(net) for net in nets])
+
+        n = len(compiled.species_names)
+        k = len(nets)
+
+        def dy_dt(y, t):
+            return compiled.batch_dy_dt(y.reshape(k, n).T, parameters).T.ravel()
+
+        band = (n - 1, n - 1)
+        if not compiled.differentiable:
+            return OdeSimulator._split_batch(SolverBackend.solve(dy_dt, y0, sim, band=band), k, n)
+
+        def jacobian(y):
+            # The kth network's Jacobian is the kth block
+            return BlockDiagonal(*compiled.batch_jacobian_entries(y.reshape(k, n).T, parameters), n)
+
+        results = SolverBackend.solve(dy_dt, y0, sim,
+                                      lambda y, t: jacobian(y).banded(),
+                                      lambda y, t: jacobian(y).sparse(), band)
+        return OdeSimulator._split_batch(results, k, n)
+
+    @staticmethod
+    def _split_batch(results, k, n):
+        solution = results.solution.reshape(len(results.time_space), k, n)
+
+        def get_dense(i):
+            if results.dense is None:
+                return None
+            return lambda t: results.dense(t).reshape(k, n, *np.shape(t))[i]
+
+        return [SolverResults(results.time_space, solution[:, i], results.statistics,
+                              get_dense(i), results.t_events)
+                for i in range(k)]
+
+    """
+    Simulate class network and return results
+    :param Network net: to simulate
+    :param SimulationSettings sim: for simulation
+    :param OdeEngine engine: how the right hand side of the ODEs is evaluated
+    :returns np.ndarray of simulation results
+    """
+    @staticmethod
+    def simulate(net, sim, engine=OdeEngine.DICTIONARY):
+        return OdeSimulator.solve(net, sim, engine).solution
 
     """
     Visualise given results
     :param np.ndarray results: A two dimensional NumPy array containing results
         in the format where the ith array inside 'results' has the values
         for each species at time i. 
+    :param np.ndarray time_space: times of the results, if not the simulation settings' time space
     """
     @staticmethod
-    def visualise(net, sim, results):
+    def visualise(net, sim, results, time_space=None):
         values = StructuredResults.label_results(results, net.species)
+        if time_space is None:
+            time_space = sim.generate_time_space()
 
         plt.figure()
 
         for s in sim.plotted_species:
-            plt.plot(sim.generate_time_space(), values[s], label=s)
+            plt.plot(time_space, values[s], label=s)
 
         plt.xlabel("Time (s)")
         plt.ylabel("Concentration")
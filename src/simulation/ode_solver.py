@@ -0,0 +1,9 @@
+from enum import Enum
+
+
+class OdeSolver(Enum):
+    ODEINT = "odeint"  # scipy.integrate.odeint (LSODA) over a fixed time grid
+    LSODA = "LSODA"  # The remaining solvers are scipy.integrate.solve_ivp methods
+    BDF = "BDF"
+    RADAU = "Radau"
+    RK45 = "RK45"
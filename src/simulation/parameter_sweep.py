@@ -0,0 +1,202 @@
+import copy
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+from scipy.integrate import trapezoid
+
+from constraint_satisfaction.mutable import ReactionMutable, VariableMutable
+from models.network_snapshot import NetworkSnapshot
+from simulation.ode_simulator import OdeSimulator
+from simulation.sweep_sampling import SweepSampling
+
+
+class SweepResults:
+    """
+    Summaries of the simulations of a parameter sweep, stored column-wise with one row per point
+    :param List[str] names: name of each swept mutable, see ParameterSweep.get_name
+    :param np.ndarray values: two dimensional array where the ith row has the value of each mutable at point i
+    :param List[str] species: names of species, in the order of the columns of the summaries
+    :param Dict[str, np.ndarray] summaries: key: summary name (see ParameterSweep.SUMMARIES), value: two
+        dimensional array where the ith row has the summary of each species at point i. Rows of points whose
+        simulation failed are NaN.
+    """
+
+    def __init__(self, names, values, species, summaries):
+        self.names = names
+        self.values = values
+        self.species = species
+        self.summaries = summaries
+
+    """
+    Return a summary of the given species at each point
+    :param str summary: name of summary, e.g. "final"
+    :param str species: name of species
+    :returns np.ndarray of the summary at each point
+    """
+
+    def get_summary(self, summary, species):
+        return self.summaries[summary][:, self.species.index(species)]
+
+    """
+    Return the results as a table of named columns: one for each mutable, and one for each summary of
+    each species, named e.g. "final(A)"
+    :returns Dict[str, np.ndarray] of columns
+    """
+
+    def get_table(self):
+        table = {name: self.values[:, i] for i, name in enumerate(self.names)}
+        for summary in self.summaries:
+            for i, s in enumerate(self.species):
+                table["{}({})".format(summary, s)] = self.summaries[summary][:, i]
+        return table
+
+    def __len__(self):
+        return len(self.values)
+
+
+class ParameterSweep:
+    # Summaries computed from the simulation at each point
+    SUMMARIES = ["final", "integral", "minimum", "maximum"]
+
+    """
+    Return the name a mutable is given in sweep results
+    :param VariableMutable mutable: a mutable with a range of values
+    :returns str of name, e.g. "rate" in reaction "r1" is named "r1.rate"
+    """
+
+    @staticmethod
+    def get_name(mutable):
+        if isinstance(mutable, ReactionMutable):
+            return "{}.{}".format(mutable.reaction_name, mutable.variable_name)
+        return mutable.variable_name
+
+    @staticmethod
+    def _get_steps(mutable):
+        # The values the mutable steps through, as in constraint satisfaction
+        m = copy.deepcopy(mutable)
+        m.current_value = m.lower_bound
+        values = [m.current_value]
+        while m.next():
+            values.append(m.current_value)
+        return values
+
+    @staticmethod
+    def _get_grid(mutables):
+        return np.array(list(itertools.product(*[ParameterSweep._get_steps(m) for m in mutables])), dtype=float)
+
+    @staticmethod
+    def _get_latin_hypercube(mutables, samples, seed):
+        generator = np.random.default_rng(seed)
+        points = np.empty((samples, len(mutables)))
+
+        for i, m in enumerate(mutables):
+            # One sample from each of the equally sized strata of the range, in random order
+            strata = (generator.permutation(samples) + generator.random(samples)) / samples
+            points[:, i] = m.lower_bound + strata * (m.upper_bound - m.lower_bound)
+
+        return points
+
+    @staticmethod
+    def _summarise(results):
+        solution = results.solution
+        return [solution[-1],
+                trapezoid(solution, results.time_space, axis=0),
+                solution.min(axis=0),
+                solution.max(axis=0)]
+
+    @staticmethod
+    def _solve(nets, sim):
+        # Failed simulations are None. Besides solver failures, a rate law can fail on the values of a point
+        if len(nets) > 1:
+            try:
+                return OdeSimulator.solve_batch(nets, sim)
+            except (RuntimeError, ValueError, ArithmeticError):
+                pass  # Solve one by one, so that only the failing networks are lost
+
+        solved = []
+        for net in nets:
+            try:
+                solved.append(OdeSimulator.solve(net, sim))
+            except (RuntimeError, ValueError, ArithmeticError):
+                solved.append(None)
+        return solved
+
+    @staticmethod
+    def _run_chunk(net, sim, mutables, points, batch_size):
+        summaries = np.full((len(ParameterSweep.SUMMARIES), len(points), len(net.species)), np.nan)
+
+        # Each point is a copy of a snapshot of the network if possible, rather than a deep copy of the network
+        try:
+            base = NetworkSnapshot.of(net, mutables)
+        except ValueError:
+            base = net
+
+        for start in range(0, len(points), batch_size):
+            nets = []
+            for point in points[start:start + batch_size]:
+                # Mutated the same way as in constraint satisfaction
+                for m, value in zip(mutables, point):
+                    m.current_value = value
+                mutated = base.copy() if isinstance(base, NetworkSnapshot) else copy.deepcopy(base)
+                mutated.mutate(mutables)
+                nets.append(mutated)
+
+            for i, results in enumerate(ParameterSweep._solve(nets, sim)):
+                if results is not None:
+                    for s, summary in enumerate(ParameterSweep._summarise(results)):
+                        summaries[s, start + i] = summary
+
+        return summaries
+
+    """
+    Simulate the network at each point of a sample of the ranges of the given mutables, across a pool of
+    processes, and return summaries of the simulations. Only the summaries are sent back from the workers,
+    so memory use does not depend on the length of the simulations.
+    :param Network net: to simulate, not changed
+    :param SimulationSettings sim: for simulation
+    :param List[VariableMutable] mutables: species, reaction parameters and global parameters to sweep,
+        from their lower to their upper bound
+    :param SweepSampling sampling: how points are chosen. SweepSampling.GRID takes every combination of the
+        values each mutable steps through by its increments.
+    :param int samples: number of points, for SweepSampling.LATIN_HYPERCUBE
+    :param int seed: seed of the sample, for SweepSampling.LATIN_HYPERCUBE
+    :param int processes: number of worker processes, None for one per CPU
+    :param int chunk_size: number of points sent to a worker at once, None for a few chunks per worker
+    :param int batch_size: number of points simulated together with OdeSimulator.solve_batch. With 1, each
+        point is simulated with OdeSimulator.solve, as in constraint satisfaction.
+    :returns SweepResults of the sweep
+    """
+
+    @staticmethod
+    def run(net, sim, mutables, sampling=SweepSampling.GRID, samples=None, seed=None, processes=None,
+            chunk_size=None, batch_size=1):
+        for m in mutables:
+            if not isinstance(m, VariableMutable):
+                raise ValueError("Only mutables with a range of values can be swept: {}".format(m))
+        if sampling == SweepSampling.LATIN_HYPERCUBE and not samples:
+            raise ValueError("A Latin hypercube sweep needs a number of samples")
+
+        if sampling == SweepSampling.LATIN_HYPERCUBE:
+            points = ParameterSweep._get_latin_hypercube(mutables, samples, seed)
+        else:
+            points = ParameterSweep._get_grid(mutables)
+
+        processes = processes or os.cpu_count()
+        chunk_size = chunk_size or max(1, -(-len(points) // (4 * processes)))
+        summaries = np.empty((len(ParameterSweep.SUMMARIES), len(points), len(net.species)))
+
+        with ProcessPoolExecutor(processes) as pool:
+            futures = {pool.submit(ParameterSweep._run_chunk, net, sim, mutables,
+                                   points[start:start + chunk_size], batch_size): start
+                       for start in range(0, len(points), chunk_size)}
+
+            # Filled in as chunks complete
+            for future in as_completed(futures):
+                chunk = future.result()
+                start = futures[future]
+                summaries[:, start:start + chunk.shape[1]] = chunk
+
+        return SweepResults([ParameterSweep.get_name(m) for m in mutables], points, list(net.species.keys()),
+                            dict(zip(ParameterSweep.SUMMARIES, summaries)))
@@ -0,0 +1,62 @@
+import numpy as np
+
+
+class PropensityTree:
+    """
+    Binary sum tree over reaction propensities: each node holds the sum of its children, so
+    changing a propensity and picking a reaction with probability proportional to its propensity
+    both take O(log R), rather than the O(R) of a cumulative sum.
+    :param np.ndarray propensities: initial propensities
+    """
+
+    def __init__(self, propensities):
+        self.size = 1
+        while self.size < len(propensities):
+            self.size *= 2
+
+        # Leaves are nodes size..2*size-1, node i has children 2i and 2i+1, node 1 is the root
+        self.nodes = np.zeros(2 * self.size)
+        self.nodes[self.size:self.size + len(propensities)] = propensities
+        for i in reversed(range(1, self.size)):
+            self.nodes[i] = self.nodes[2 * i] + self.nodes[2 * i + 1]
+        self.nodes = self.nodes.tolist()
+
+    """
+    Return the sum of all propensities
+    """
+
+    def total(self):
+        return self.nodes[1]
+
+    """
+    Change the propensity of the given reaction
+    :param int j: reaction index
+    :param float propensity: new propensity
+    """
+
+    def update(self, j, propensity):
+        nodes = self.nodes
+        i = self.size + j
+        nodes[i] = propensity
+        i //= 2
+        while i:
+            nodes[i] = nodes[2 * i] + nodes[2 * i + 1]
+            i //= 2
+
+    """
+    Return the reaction whose cumulative propensity interval contains the given value
+    :param float value: between 0 and total()
+    :returns int of reaction index
+    """
+
+    def search(self, value):
+        nodes = self.nodes
+        i = 1
+        while i < self.size:
+            left = nodes[2 * i]
+            if value < left or nodes[2 * i + 1] <= 0:
+                i = 2 * i
+            else:
+                value -= left
+                i = 2 * i + 1
+        return i - self.size
@@ -0,0 +1,38 @@
+from math import log
+
+import numpy as np
+
+
+class RandomStream:
+    """
+    Uniform random numbers from a numpy Generator, drawn in blocks rather than one call per number
+    :param Any seed: seed of the generator: None, an int, a numpy SeedSequence or a numpy Generator
+    :param int block_size: how many numbers to draw at once
+    """
+
+    def __init__(self, seed=None, block_size=4096):
+        self.generator = np.random.default_rng(seed)
+        self.block_size = block_size
+        self._block = []
+        self._index = 0
+
+    """
+    Return a uniform random number in [0, 1)
+    """
+
+    def uniform(self):
+        if self._index == len(self._block):
+            self._block = self.generator.random(self.block_size).tolist()
+            self._index = 0
+
+        u = self._block[self._index]
+        self._index += 1
+        return u
+
+    """
+    Return an exponentially distributed random number
+    :param float rate: rate of the distribution
+    """
+
+    def exponential(self, rate):
+        return -log(1 - self.uniform()) / rate
@@ -0,0 +1,8 @@
+from enum import Enum
+
+
+class RecordingPolicy(Enum):
+    ALL = 1  # Every event
+    GRID = 2  # State at each time of the simulation settings' time space, held from the last event before it
+    EVERY_KTH = 3  # Every kth event
+    CHANGES = 4  # Only events which change one of the plotted species
@@ -0,0 +1,148 @@
+import numpy as np
+
+from simulation.block_diagonal import BlockDiagonal
+from simulation.parameter_sweep import ParameterSweep
+from simulation.solver_backend import SolverBackend
+
+
+class SensitivityResults:
+    """
+    A simulation together with the sensitivity of every species to each parameter over time
+    :param np.ndarray time_space: times at which the solution was stored
+    :param np.ndarray solution: two dimensional array where the ith row has the value of each species
+        at time_space[i]
+    :param List[str] species: names of species, in the order of the columns of solution
+    :param List[str] parameters: names of the parameters, see SensitivityAnalysis.get_parameter_names
+    :param np.ndarray values: value of each parameter
+    :param np.ndarray sensitivities: three dimensional array where [t, i, q] is the derivative of species i
+        at time_space[t] with respect to parameter q
+    :param Dict[str, int] statistics: solver statistics, see SolverResults
+    """
+
+    def __init__(self, time_space, solution, species, parameters, values, sensitivities, statistics):
+        self.time_space = time_space
+        self.solution = solution
+        self.species = species
+        self.parameters = parameters
+        self.values = values
+        self.sensitivities = sensitivities
+        self.statistics = statistics
+
+    """
+    Return the derivative of a species with respect to a parameter over time
+    :param str species: name of species
+    :param str parameter: name of parameter
+    :returns np.ndarray of the derivative at each time
+    """
+
+    def get_sensitivity(self, species, parameter):
+        return self.sensitivities[:, self.species.index(species), self.parameters.index(parameter)]
+
+    """
+    Return how much each parameter affects the species, as the root mean square over time and species
+    of its scaled sensitivities p * dy/dp / max|y|. Sensitivities to a species are scaled by the largest
+    absolute value the species takes, so that small species do not dominate.
+    :returns Dict[str, float] key: parameter name, value: importance
+    """
+
+    def get_importance(self):
+        scale = np.abs(self.solution).max(axis=0)
+        scale[scale == 0] = 1
+        scaled = self.sensitivities * self.values / scale[None, :, None]
+        importance = np.sqrt((scaled ** 2).mean(axis=(0, 1)))
+        return dict(zip(self.parameters, importance.tolist()))
+
+    """
+    Return the given mutables from the most to the least important, see get_importance.
+    Mutables which are not parameters of the analysis come last.
+    :param List[VariableMutable] mutables: mutables to rank, named as in ParameterSweep.get_name
+    :returns List[VariableMutable] of the mutables, sorted
+    """
+
+    def rank(self, mutables):
+        importance = self.get_importance()
+        return sorted(mutables, key=lambda m: -importance.get(ParameterSweep.get_name(m), -1))
+
+
+class SensitivityAnalysis:
+    """
+    Return the names of the parameters of a compiled network: symbols by their name, and reaction
+    parameters as "<reaction name>.<parameter name>", e.g. "r1.rate" or "r1.k_0" for the dissociation
+    constant of a transcription's first regulator. Initial species values are named by the species.
+    :param CompiledNetwork compiled: compiled network
+    :returns List[str] of names, ordered as compiled.parameters
+    """
+
+    @staticmethod
+    def get_parameter_names(compiled):
+        names = [None] * len(compiled.parameters)
+        for (j, name), i in compiled.parameter_index.items():
+            names[i] = name if j is None else "{}.{}".format(compiled.reactions[j].name, name)
+        return names
+
+    """
+    Simulate the network together with the forward sensitivities of its species to the given parameters,
+    s_q = dy/dp_q, by integrating the augmented system ds_q/dt = J s_q + df/dp_q using analytic partial
+    derivatives of the rate laws.
+    :param Network net: to simulate
+    :param SimulationSettings sim: for simulation
+    :param List[str] parameters: names of parameters (see get_parameter_names), or of species for sensitivities
+        to their initial values. None for every parameter other than initial values.
+    :returns SensitivityResults of the simulation
+    :raises ValueError: if a rate law cannot be differentiated, or a parameter does not exist
+    """
+
+    @staticmethod
+    def solve(net, sim, parameters=None):
+        compiled = net.get_compiled()
+        if not compiled.differentiable:
+            raise ValueError("Sensitivities need rate laws which can be differentiated")
+
+        names = SensitivityAnalysis.get_parameter_names(compiled)
+        if parameters is None:
+            parameters = names
+
+        n = len(compiled.species_names)
+        q = len(parameters)
+        # Columns of the parameter Jacobian of each parameter, -1 for initial values
+        columns = np.full(q, -1)
+        y0 = compiled.get_state(net)
+        s0 = np.zeros((q, n))
+        values = np.empty(q)
+
+        for i, name in enumerate(parameters):
+            if name in names:
+                columns[i] = names.index(name)
+                values[i] = compiled.parameters[columns[i]]
+            elif name in compiled.species_index:
+                s0[i, compiled.species_index[name]] = 1
+                values[i] = y0[compiled.species_index[name]]
+            else:
+                raise ValueError("No such parameter: {}".format(name))
+
+        initial_values = columns < 0
+
+        def dz_dt(z, t):
+            y = z[:n]
+            s = z[n:].reshape(q, n).T
+
+            forcing = compiled.parameter_jacobian(y, t)[:, columns]
+            forcing[:, initial_values] = 0
+            ds = compiled.jacobian(y, t) @ s + forcing
+
+            return np.concatenate([compiled.dy_dt(y, t), ds.T.ravel()])
+
+        def jacobian(z):
+            # Every block is the Jacobian of the network. The terms coupling the sensitivities to the state
+            # through second derivatives are left out, which only slows the solver's convergence.
+            rows, cols, entries = compiled.jacobian_entries(z[:n])
+            return BlockDiagonal(rows, cols, np.repeat(entries[:, None], q + 1, axis=1), n)
+
+        results = SolverBackend.solve(dz_dt, np.concatenate([y0, s0.ravel()]), sim,
+                                      lambda z, t: jacobian(z).banded(),
+                                      lambda z, t: jacobian(z).sparse(), (n - 1, n - 1))
+
+        solution = results.solution[:, :n]
+        sensitivities = results.solution[:, n:].reshape(len(results.time_space), q, n).transpose(0, 2, 1)
+        return SensitivityResults(results.time_space, solution, compiled.species_names, list(parameters),
+                                  values, sensitivities, results.statistics)
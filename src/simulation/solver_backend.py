@@ -0,0 +1,105 @@
+import numpy as np
+from scipy.integrate import odeint, solve_ivp
+
+from simulation.ode_solver import OdeSolver
+
+
+class SolverResults:
+    """
+    :param np.ndarray time_space: times at which the solution was stored
+    :param np.ndarray solution: two dimensional array where the ith row has the value of each species
+        at time_space[i]
+    :param Dict[str, int] statistics: solver statistics; nfev: number of dy_dt evaluations,
+        njev: number of Jacobian evaluations, nlu: number of LU decompositions (solve_ivp methods),
+        steps: number of integration steps (odeint, and solve_ivp methods with adaptive output)
+    :param Callable[[float], np.ndarray] dense: continuous solution, None unless dense output was requested
+    :param List[np.ndarray] t_events: for each event in the simulation settings, the times it occurred at
+    """
+
+    def __init__(self, time_space, solution, statistics, dense=None, t_events=None):
+        self.time_space = time_space
+        self.solution = solution
+        self.statistics = statistics
+        self.dense = dense
+        self.t_events = t_events
+
+
+class SolverBackend:
+    # Solvers which make use of a Jacobian, and whether they accept it as a sparse matrix
+    SPARSE_JACOBIAN = {OdeSolver.BDF: True, OdeSolver.RADAU: True, OdeSolver.LSODA: False}
+
+    """
+    Solve the ODEs with the solver chosen in the simulation settings
+    :param Callable[[np.ndarray, float], np.ndarray] dy_dt: right hand side, called as dy_dt(y, t)
+    :param List[float] y0: initial state
+    :param SimulationSettings sim: simulation settings, including the solver and its options
+    :param Callable[[np.ndarray, float], np.ndarray] jacobian: Jacobian of dy_dt, called as jacobian(y, t).
+        If None, the solver estimates it by finite differences.
+    :param Callable[[np.ndarray, float], Any] jacobian_sparse: as jacobian, but returning a sparse matrix
+    :param Tuple[int, int] band: (lower, upper) bandwidth of the Jacobian, None if it is not banded. If given,
+        jacobian returns the Jacobian in banded form, as used by scipy.linalg.solve_banded.
+    :returns SolverResults of the simulation
+    """
+
+    @staticmethod
+    def solve(dy_dt, y0, sim, jacobian=None, jacobian_sparse=None, band=None):
+        if sim.solver == OdeSolver.ODEINT:
+            return SolverBackend._solve_odeint(dy_dt, y0, sim, jacobian, band)
+        else:
+            return SolverBackend._solve_ivp(dy_dt, y0, sim, jacobian, jacobian_sparse, band)
+
+    @staticmethod
+    def _get_tolerances(sim):
+        tolerances = dict()
+        if sim.rtol is not None:
+            tolerances["rtol"] = sim.rtol
+        if sim.atol is not None:
+            tolerances["atol"] = sim.atol
+        return tolerances
+
+    @staticmethod
+    def _solve_odeint(dy_dt, y0, sim, jacobian, band):
+        options = SolverBackend._get_tolerances(sim)
+        if band:
+            options["ml"], options["mu"] = band
+
+        # odeint only reports the solution on a fixed grid, so adaptive output does not apply
+        time_space = sim.generate_time_space()
+        solution, info = odeint(dy_dt, y0, time_space, Dfun=jacobian, full_output=True, **options)
+
+        statistics = {"nfev": int(info["nfe"][-1]), "njev": int(info["nje"][-1]), "steps": int(info["nst"][-1])}
+        return SolverResults(time_space, solution, statistics)
+
+    @staticmethod
+    def _solve_ivp(dy_dt, y0, sim, jacobian, jacobian_sparse, band):
+        options = SolverBackend._get_tolerances(sim)
+
+        if sim.solver in SolverBackend.SPARSE_JACOBIAN:
+            if SolverBackend.SPARSE_JACOBIAN[sim.solver] and jacobian_sparse:
+                options["jac"] = lambda t, y: jacobian_sparse(y, t)
+            elif band and sim.solver == OdeSolver.LSODA:
+                # Only LSODA takes a banded Jacobian
+                options["lband"], options["uband"] = band
+                if jacobian:
+                    options["jac"] = lambda t, y: jacobian(y, t)
+            elif jacobian and not band:
+                options["jac"] = lambda t, y: jacobian(y, t)
+
+        events = list(sim.events) if sim.events else None
+
+        solution = solve_ivp(lambda t, y: dy_dt(y, t), (sim.start_time, sim.end_time), y0,
+                             method=sim.solver.value,
+                             t_eval=None if sim.adaptive_output else sim.generate_time_space(),
+                             dense_output=sim.dense_output,
+                             events=events,
+                             **options)
+
+        if solution.status == -1:
+            raise RuntimeError("Integration failed: {}".format(solution.message))
+
+        statistics = {"nfev": int(solution.nfev), "njev": int(solution.njev), "nlu": int(solution.nlu)}
+        if sim.adaptive_output:
+            # Only the solver's own steps are stored
+            statistics["steps"] = len(solution.t) - 1
+        return SolverResults(solution.t, np.transpose(solution.y), statistics,
+                             solution.sol, solution.t_events if events else [])
@@ -0,0 +1,7 @@
+from enum import Enum
+
+
+class SteadyStateMethod(Enum):
+    NEWTON = 1  # Damped Newton iteration with the analytic Jacobian
+    NEWTON_KRYLOV = 2  # Jacobian-free Newton-Krylov, for networks without an analytic Jacobian
+    PSEUDO_TRANSIENT = 3  # Pseudo-transient continuation, when Newton iteration fails
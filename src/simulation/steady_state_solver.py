@@ -0,0 +1,204 @@
+import warnings
+
+import numpy as np
+from scipy.optimize import newton_krylov, NoConvergence
+from scipy.sparse import issparse, identity
+from scipy.sparse.linalg import spsolve, MatrixRankWarning
+
+from simulation.steady_state_method import SteadyStateMethod
+
+
+class SteadyState:
+    """
+    :param List[str] species: names of species, in the order of state
+    :param np.ndarray state: value of each species at the steady state
+    :param np.ndarray eigenvalues: eigenvalues of the Jacobian at the steady state
+    :param bool stable: whether no eigenvalue has a positive real part. Conserved quantities give
+        eigenvalues of zero, so these count as stable.
+    :param float residual: largest absolute rate of change of a species at the steady state
+    :param SteadyStateMethod method: method which found the steady state
+    """
+
+    def __init__(self, species, state, eigenvalues, stable, residual, method):
+        self.species = species
+        self.state = state
+        self.eigenvalues = eigenvalues
+        self.stable = stable
+        self.residual = residual
+        self.method = method
+
+    """
+    Return the value of the given species at the steady state
+    :param str species: name of species
+    :returns float of value
+    """
+
+    def get_species(self, species):
+        return self.state[self.species.index(species)]
+
+
+class SteadyStateSolver:
+    # Eigenvalues whose real part is at most this are not counted as unstable
+    ZERO_TOLERANCE = 1e-8
+    # Step sizes of pseudo-transient continuation
+    INITIAL_STEP = 1e-2
+    MAX_STEP = 1e12
+    STEP_GROWTH = 1.5
+
+    @staticmethod
+    def _norm(values):
+        return np.abs(values).max() if len(values) else 0.0
+
+    @staticmethod
+    def _solve_linear(matrix, rhs):
+        if issparse(matrix):
+            # A singular matrix gives NaNs, which the callers check for
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", MatrixRankWarning)
+                return spsolve(matrix.tocsc(), rhs)
+        try:
+            return np.linalg.solve(matrix, rhs)
+        except np.linalg.LinAlgError:
+            return np.full(len(rhs), np.nan)
+
+    @staticmethod
+    def _finite_difference_jacobian(f, y):
+        fy = f(y)
+        jacobian = np.empty((len(y), len(y)))
+        for i in range(len(y)):
+            h = 1e-7 * max(1.0, abs(y[i]))
+            shifted = y.copy()
+            shifted[i] += h
+            jacobian[:, i] = (f(shifted) - fy) / h
+        return jacobian
+
+    @staticmethod
+    def _is_valid(y, tolerance):
+        # Species cannot be negative
+        return np.isfinite(y).all() and (y >= -tolerance).all()
+
+    @staticmethod
+    def _newton(f, jacobian, y, tolerance, max_iterations):
+        fy = f(y)
+
+        for _ in range(max_iterations):
+            if SteadyStateSolver._norm(fy) <= tolerance:
+                return y
+
+            step = SteadyStateSolver._solve_linear(jacobian(y), -fy)
+            if not np.isfinite(step).all():
+                return None
+
+            # Halve the step until the residual decreases, keeping species from becoming negative
+            damping = 1.0
+            while damping > 1e-8:
+                candidate = np.maximum(y + damping * step, 0)
+                f_candidate = f(candidate)
+                if np.isfinite(f_candidate).all() and np.linalg.norm(f_candidate) < np.linalg.norm(fy):
+                    break
+                damping /= 2
+            else:
+                return None
+
+            y, fy = candidate, f_candidate
+
+        return y if SteadyStateSolver._norm(fy) <= tolerance else None
+
+    @staticmethod
+    def _newton_krylov(f, y, tolerance, max_iterations):
+        try:
+            return newton_krylov(f, y, f_tol=tolerance, maxiter=max_iterations)
+        except (NoConvergence, ValueError, np.linalg.LinAlgError):
+            return None
+
+    @staticmethod
+    def _pseudo_transient(f, jacobian, y, tolerance, max_iterations):
+        # Implicit Euler steps of dy/dt = f(y) whose size grows as the residual falls, so that the
+        # iteration follows the dynamics far from the steady state and becomes Newton's method near it
+        dt = SteadyStateSolver.INITIAL_STEP
+        fy = f(y)
+        residual = SteadyStateSolver._norm(fy)
+
+        for _ in range(max_iterations):
+            if residual <= tolerance:
+                return y
+
+            j = jacobian(y)
+            eye = identity(len(y), format="csc") if issparse(j) else np.eye(len(y))
+            candidate = y + SteadyStateSolver._solve_linear(eye / dt - j, fy)
+            f_candidate = f(candidate)
+            candidate_residual = SteadyStateSolver._norm(f_candidate)
+
+            if not SteadyStateSolver._is_valid(candidate, tolerance) or not np.isfinite(candidate_residual):
+                dt /= 10
+                if dt < 1e-12:
+                    return None
+                continue
+
+            # Grow the step at least geometrically, faster if the residual falls (switched evolution relaxation),
+            # as the residual may rise for a while on the way to the steady state
+            growth = max(SteadyStateSolver.STEP_GROWTH, residual / max(candidate_residual, 1e-300))
+            dt = min(dt * growth, SteadyStateSolver.MAX_STEP)
+            y, fy, residual = candidate, f_candidate, candidate_residual
+
+        return y if residual <= tolerance else None
+
+    @staticmethod
+    def _get_steady_state(compiled, f, y, method):
+        if compiled.differentiable:
+            dense = compiled.jacobian(y, 0)
+        else:
+            dense = SteadyStateSolver._finite_difference_jacobian(f, y)
+        eigenvalues = np.linalg.eigvals(dense)
+        stable = bool((eigenvalues.real <= SteadyStateSolver.ZERO_TOLERANCE).all())
+
+        return SteadyState(compiled.species_names, y, eigenvalues, stable, SteadyStateSolver._norm(f(y)), method)
+
+    """
+    Find a steady state of the network, i.e. a state where the rate of change of every species is zero,
+    and whether it is stable. Newton's method is tried first, from the network's current state. If it fails,
+    gives negative species or finds an unstable steady state, pseudo-transient continuation is tried, which
+    follows the dynamics towards the stable steady state they reach, if there is one.
+    :param Network net: network whose steady state to find, not changed
+    :param float tolerance: largest absolute rate of change of a species accepted at the steady state
+    :param int max_iterations: most iterations of each method
+    :returns SteadyState of the network
+    :raises RuntimeError: if no steady state is found
+    """
+
+    @staticmethod
+    def solve(net, tolerance=1e-9, max_iterations=500):
+        compiled = net.get_compiled()
+        y0 = compiled.get_state(net)
+
+        def f(y):
+            return compiled.dy_dt(y, 0)
+
+        if compiled.differentiable:
+            def jacobian(y):
+                return compiled.jacobian_sparse(y, 0)
+
+            y = SteadyStateSolver._newton(f, jacobian, y0, tolerance, max_iterations)
+            method = SteadyStateMethod.NEWTON
+        else:
+            def jacobian(y):
+                return SteadyStateSolver._finite_difference_jacobian(f, y)
+
+            y = SteadyStateSolver._newton_krylov(f, y0, tolerance, max_iterations)
+            method = SteadyStateMethod.NEWTON_KRYLOV
+
+        newton = None
+        if y is not None and SteadyStateSolver._is_valid(y, tolerance):
+            newton = SteadyStateSolver._get_steady_state(compiled, f, y, method)
+            if newton.stable:
+                return newton
+
+        y = SteadyStateSolver._pseudo_transient(f, jacobian, y0, tolerance, max_iterations)
+        if y is not None:
+            continuation = SteadyStateSolver._get_steady_state(compiled, f, y, SteadyStateMethod.PSEUDO_TRANSIENT)
+            if continuation.stable or newton is None:
+                return continuation
+
+        if newton is None:
+            raise RuntimeError("No steady state found")
+        return newton
@@ -0,0 +1,7 @@
+from enum import Enum
+
+
+class StochasticMethod(Enum):
+    DIRECT = 1  # Gillespie's direct method, see GillespieSimulator
+    NEXT_REACTION = 2  # Gibson-Bruck Next Reaction Method, see NextReactionSimulator
+    TAU_LEAPING = 3  # Adaptive tau-leaping, see TauLeapingSimulator
@@ -0,0 +1,38 @@
+import numpy as np
+
+
+class StochasticResults:
+    """
+    A stochastic trajectory stored column-wise
+    :param List[str] species: names of species, in the order of the columns of counts
+    :param np.ndarray times: time of each recorded point, starting with the initial state
+    :param np.ndarray counts: two dimensional integer array where the ith row has the count
+        of each species at times[i]
+    """
+
+    def __init__(self, species, times, counts):
+        self.species = species
+        self.times = times
+        self.counts = counts
+
+    """
+    Return the counts of the given species at each recorded time
+    :param str species: name of species
+    :returns np.ndarray of counts
+    """
+
+    def get_species(self, species):
+        return self.counts[:, self.species.index(species)]
+
+    """
+    Return the trajectory sampled on the given time grid. Each time takes the last recorded
+    state at or before it (sample and hold).
+    :param np.ndarray time_space: time grid, starting no earlier than the first recorded time
+    :returns np.ndarray with a row for each time in time_space and a column for each species
+    """
+
+    def sample(self, time_space):
+        return self.counts[np.searchsorted(self.times, time_space, side="right") - 1]
+
+    def __len__(self):
+        return len(self.times)
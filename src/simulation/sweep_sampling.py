@@ -0,0 +1,6 @@
+from enum import Enum
+
+
+class SweepSampling(Enum):
+    GRID = 1  # Every combination of the values each mutable steps through
+    LATIN_HYPERCUBE = 2  # Latin hypercube sample of the ranges of the mutables
@@ -0,0 +1,159 @@
+import numpy as np
+
+from simulation.random_stream import RandomStream
+from simulation.trajectory_recorder import TrajectoryRecorder
+
+"""
+Adaptive tau-leaping: rather than firing one reaction at a time, leap over a time step tau
+in which every reaction fires a Poisson distributed number of times. tau is chosen such that
+no propensity is expected to change by more than a fraction epsilon, reactions which could
+exhaust a species are treated as critical and fire at most once per leap, and when tau would be
+so small that leaping gains nothing, exact SSA steps are taken instead.
+
+Source: Efficient step size selection for the tau-leaping simulation method, Y. Cao, D. T. Gillespie
+    and L. R. Petzold, J. Chem. Phys. 124, 044109 (2006)
+"""
+
+
+class TauLeapingSimulator:
+    EPSILON = 0.03  # Bound on the relative change of propensities in a leap
+    CRITICAL_THRESHOLD = 10  # Reactions which can fire fewer times than this before exhausting a species
+    SSA_THRESHOLD = 10  # Take exact steps when tau would be below this many mean SSA steps...
+    SSA_STEPS = 100  # ...and take this many of them
+
+    @staticmethod
+    def _get_highest_orders(compiled, net):
+        """
+        Return g_i of Cao et al. for every species, approximated by how many molecules of the species
+        the reactions consuming it use. Species read by rates but never consumed get 1.
+        """
+
+        orders = np.ones(len(compiled.species_names))
+        for r in net.reactions:
+            for x in set(r.left):
+                i = compiled.species_index[x]
+                orders[i] = max(orders[i], r.left.count(x))
+        return orders
+
+    @staticmethod
+    def _get_tau(state, propensities, non_critical, stoichiometry, orders, watched):
+        """
+        Return the largest leap for which the leap condition holds, inf if nothing can change
+        :param np.ndarray watched: mask of species whose change affects propensities
+        """
+
+        a = propensities * non_critical
+        mu = stoichiometry @ a
+        sigma = (stoichiometry ** 2) @ a
+
+        bound = np.maximum(TauLeapingSimulator.EPSILON * state / orders, 1)[watched]
+        mu = np.abs(mu[watched])
+        sigma = sigma[watched]
+
+        with np.errstate(divide="ignore"):
+            taus = np.concatenate((bound / mu, bound ** 2 / sigma))
+        return taus.min() if len(taus) else np.inf
+
+    @staticmethod
+    def _ssa_steps(state, t, end_time, compiled, stoichiometry, stream, steps, recorder):
+        """
+        Take up to the given number of exact direct method steps, recording the state after each one.
+        A reaction which would happen after the end time is not applied, and the end time is returned.
+        :returns float of the new time
+        """
+
+        for _ in range(steps):
+            propensities = compiled.propensities(state)
+            a0 = propensities.sum()
+            if a0 <= 0:
+                # Nothing can happen any more
+                recorder.record(end_time, state)
+                return end_time
+
+            t += stream.exponential(a0)
+            if t >= end_time:
+                recorder.record(end_time, state)
+                return end_time
+
+            cumulative = np.cumsum(propensities)
+            j = min(np.searchsorted(cumulative, stream.uniform() * a0, side="right"), len(cumulative) - 1)
+            state += stoichiometry[:, j]
+            recorder.record(t, state)
+
+        return t
+
+    """
+    Performs a stochastic simulation of the given network with adaptive tau-leaping.
+    Takes the same arguments and returns results in the same format as GillespieSimulator.simulate,
+    with one result per leap or exact step.
+    :param Network net: to simulate
+    :param SimulationSettings sim: for simulation
+    :returns StochasticResults of the simulation
+    """
+
+    @staticmethod
+    def simulate(net, sim):
+        compiled = net.get_compiled()
+        stoichiometry = compiled.stoichiometry.astype(np.int64)
+        names = compiled.species_names
+        reactants = stoichiometry < 0
+        orders = TauLeapingSimulator._get_highest_orders(compiled, net)
+
+        watched = reactants.any(axis=1)
+        for species in compiled.dependencies:
+            watched[species] = True
+
+        state = compiled.get_counts(net)
+        stream = RandomStream(sim.seed)
+        generator = stream.generator
+        end_time = sim.end_time
+
+        t = 0
+        recorder = TrajectoryRecorder.from_settings(names, sim)
+        recorder.record(t, state)
+
+        while t < end_time:
+            propensities = compiled.propensities(state)
+            a0 = propensities.sum()
+            if a0 <= 0:
+                break
+
+            # How many times each reaction can fire before exhausting one of its reactants
+            with np.errstate(divide="ignore", invalid="ignore"):
+                firings_left = np.where(reactants, np.floor(state[:, None] / -stoichiometry), np.inf).min(axis=0)
+            critical = (propensities > 0) & (firings_left < TauLeapingSimulator.CRITICAL_THRESHOLD)
+            non_critical = ~critical
+
+            tau = TauLeapingSimulator._get_tau(state, propensities, non_critical, stoichiometry, orders, watched)
+
+            if tau < TauLeapingSimulator.SSA_THRESHOLD / a0:
+                t = TauLeapingSimulator._ssa_steps(state, t, end_time, compiled, stoichiometry, stream,
+                                                   TauLeapingSimulator.SSA_STEPS, recorder)
+                continue
+
+            a0_critical = propensities[critical].sum()
+            while True:
+                critical_tau = stream.exponential(a0_critical) if a0_critical > 0 else np.inf
+                # The last leap ends exactly at the end time
+                leap = min(tau, critical_tau, end_time - t)
+
+                firings = np.zeros(len(propensities), dtype=np.int64)
+                firings[non_critical] = generator.poisson(propensities[non_critical] * leap)
+                if critical_tau <= leap:
+                    # One critical reaction fires, chosen in proportion to its propensity
+                    cumulative = np.cumsum(np.where(critical, propensities, 0))
+                    j = np.searchsorted(cumulative, stream.uniform() * a0_critical, side="right")
+                    firings[min(j, len(cumulative) - 1)] = 1
+
+                new_state = state + stoichiometry @ firings
+                if (new_state >= 0).all():
+                    break
+                # Leapt too far, some species went negative: retry with half the step
+                tau /= 2
+
+            state = new_state
+            t += leap
+            recorder.record(t, state)
+
+        net.species = dict(zip(names, state.tolist()))
+        return recorder.get_results()
@@ -0,0 +1,138 @@
+import numpy as np
+
+from simulation.recording_policy import RecordingPolicy
+from simulation.stochastic_results import StochasticResults
+
+
+class TrajectoryRecorder:
+    """
+    Records a stochastic trajectory into preallocated arrays, doubling them when they fill up.
+    Which of the recorded points are kept depends on the recording policy, see RecordingPolicy.
+    Apart from with RecordingPolicy.GRID, the initial and the last point are always kept.
+    :param List[str] species: names of species, in the order of the state vector
+    :param int capacity: number of points to allocate space for initially
+    :param RecordingPolicy policy: which points to keep
+    :param np.ndarray time_space: time grid, for RecordingPolicy.GRID
+    :param int every: keep every this many points, for RecordingPolicy.EVERY_KTH
+    :param List[str] watched: species whose changes are kept, for RecordingPolicy.CHANGES.
+        All species if None.
+    """
+
+    def __init__(self, species, capacity=1024, policy=RecordingPolicy.ALL, time_space=None, every=1, watched=None):
+        self.species = species
+        self.policy = policy
+        self.size = 0
+
+        if policy == RecordingPolicy.GRID:
+            self.time_space = np.array(time_space, dtype=float)
+            capacity = len(self.time_space)
+
+        self.times = np.empty(capacity)
+        self.counts = np.empty((capacity, len(species)), dtype=np.int64)
+
+        self.every = max(1, int(every))
+        self.watched = np.array([species.index(s) for s in watched] if watched is not None
+                                else range(len(species)), dtype=int)
+
+        self._seen = 0
+        # Last kept state (GRID: all species, CHANGES: watched species)
+        self._held = None
+        # Last point given to record, kept or not
+        self._last_time = None
+        self._last_state = None
+
+    """
+    Return a recorder for a simulation with the given settings
+    :param List[str] species: names of species, in the order of the state vector
+    :param SimulationSettings sim: settings of the simulation
+    :returns TrajectoryRecorder following the recording policy of the settings
+    """
+
+    @staticmethod
+    def from_settings(species, sim):
+        if sim.recording == RecordingPolicy.GRID:
+            return TrajectoryRecorder(species, policy=RecordingPolicy.GRID, time_space=sim.generate_time_space())
+        elif sim.recording == RecordingPolicy.EVERY_KTH:
+            return TrajectoryRecorder(species, policy=RecordingPolicy.EVERY_KTH, every=sim.record_every)
+        elif sim.recording == RecordingPolicy.CHANGES:
+            watched = [s for s in sim.plotted_species if s in species]
+            return TrajectoryRecorder(species, policy=RecordingPolicy.CHANGES, watched=watched)
+        else:
+            return TrajectoryRecorder(species)
+
+    """
+    Record the state at the given time
+    :param float t: time
+    :param np.ndarray state: integer state vector
+    """
+
+    def record(self, t, state):
+        if self.policy == RecordingPolicy.GRID:
+            self._record_grid(t, state)
+            return
+
+        if self.policy == RecordingPolicy.EVERY_KTH:
+            keep = self._seen % self.every == 0
+        elif self.policy == RecordingPolicy.CHANGES:
+            keep = self._held is None or (state[self.watched] != self._held).any()
+            if keep:
+                self._held = state[self.watched]
+        else:
+            keep = True
+
+        self._seen += 1
+        if keep:
+            self._append(t, state)
+
+        # Not copied: simulators only change the state after calling record again
+        self._last_time = t
+        self._last_state = state
+
+    def _record_grid(self, t, state):
+        if self._held is None:
+            self._held = np.array(state, dtype=np.int64)
+            return
+
+        # Grid times before t still see the state held since the previous point
+        end = np.searchsorted(self.time_space, t, side="left")
+        if end > self.size:
+            self.counts[self.size:end] = self._held
+            self.size = end
+        self._held[:] = state
+
+    def _append(self, t, state):
+        if self.size == len(self.times):
+            self._grow()
+
+        self.times[self.size] = t
+        self.counts[self.size] = state
+        self.size += 1
+
+    def _grow(self):
+        capacity = 2 * len(self.times)
+
+        times = np.empty(capacity)
+        times[:self.size] = self.times
+        counts = np.empty((capacity, len(self.species)), dtype=np.int64)
+        counts[:self.size] = self.counts
+
+        self.times = times
+        self.counts = counts
+
+    """
+    Return the recorded trajectory, trimmed to the points recorded
+    :returns StochasticResults of the recording
+    """
+
+    def get_results(self):
+        if self.policy == RecordingPolicy.GRID:
+            # The simulation ended, so the last state holds for the rest of the grid
+            if self._held is not None:
+                self.counts[self.size:] = self._held
+                self.size = len(self.time_space)
+            return StochasticResults(self.species, self.time_space.copy(), self.counts[:self.size].copy())
+
+        if self._last_state is not None and self.times[self.size - 1] < self._last_time:
+            self._append(self._last_time, self._last_state)
+
+        return StochasticResults(self.species, self.times[:self.size].copy(), self.counts[:self.size].copy())
@@ -13,22 +13,18 @@ class StructuredResults:
         self.time_space = time_space
 
     """
-    Return results between the given times
+    Return results between the given times, inclusive. The time space must be in increasing order.
     :param str species: The name of the species for which results will be returned.
     :param float t1: The lower bound for time period
     :param float t2: The uppor bound for time period
+    :returns np.ndarray of the results, a view of this object's results
     """
 
     def results_between_times(self, species, t1, t2):
-        results = list()
+        start = np.searchsorted(self.time_space, t1, side="left")
+        end = np.searchsorted(self.time_space, t2, side="right")
 
-        i = 0
-        for x in self.time_space:
-            if t1 <= x <= t2:
-                results.append(self.species[species][i])
-            i += 1
-
-        return results
+        return self.species[species][start:end]
 
     """
     Return a dictionary of unstructured results where key: species name, value: unstructured results for the species
@@ -0,0 +1,71 @@
+import unittest
+
+from constraint_satisfaction.constraint import Constraint
+from constraint_satisfaction.constraint_satisfaction import ConstraintSatisfaction
+from constraint_satisfaction.mutable import RegulationMutable, VariableMutable
+from constraint_satisfaction.value_constraint import Range
+from models.formulae.degradation_formula import DegradationFormula
+from models.formulae.transcription_formula import TranscriptionFormula
+from models.network import Network
+from models.reaction import Reaction
+from models.reg_type import RegType
+from models.simulation_settings import SimulationSettings
+
+
+class ConstraintSatisfactionTest(unittest.TestCase):
+    @staticmethod
+    def _regulated():
+        # X can be activated by A, which is absent, or by C, which activates it to half its rate
+        net = Network()
+        net.add_species("A", 0)
+        net.add_species("C", 10)
+        net.add_species("X", 0)
+        net.add_reaction(Reaction("tx", [], ["X"], TranscriptionFormula(5, "X")))
+        net.add_reaction(Reaction("dx", ["X"], [], DegradationFormula(0.5, "X")))
+        return net
+
+    @staticmethod
+    def _regulation_mutable():
+        return RegulationMutable("tx", ["A", "C"], VariableMutable("k", 10, 10, 1), [RegType.ACTIVATION], False, 2)
+
+    @staticmethod
+    def _regulators(net):
+        return [r.from_gene for r in net.reactions[0].rate_function.regulators]
+
+    def setUp(self):
+        ConstraintSatisfaction.cache.clear()
+        self.sim = SimulationSettings(0, 50, 501, [])
+        # Unregulated, X settles at 10. Only activation by C alone brings it to 5.
+        self.constraints = [Constraint("X", Range(4, 6), (40, 50))]
+
+    def test_regulation_mutation_does_not_depend_on_history(self):
+        m = self._regulation_mutable()
+        m.next()  # Install A
+
+        net = self._regulated()
+        net.mutate([m])
+        m.next()  # Switch to C
+        net.mutate([m])
+
+        fresh = self._regulated()
+        fresh.mutate([m])
+
+        self.assertEqual(self._regulators(net), ["C"])
+        self.assertEqual(net.get_fingerprint(), fresh.get_fingerprint())
+
+    def test_found_network_satisfies_constraints(self):
+        # The search tries A before C on the same network, but the network returned only has C
+        found = ConstraintSatisfaction.find_network(self._regulated(), self.sim, [self._regulation_mutable()],
+                                                    self.constraints, 60)
+        self.assertEqual(self._regulators(found), ["C"])
+        self.assertLessEqual(ConstraintSatisfaction._evaluate_network(found, self.sim, self.constraints), 0)
+
+    def test_find_network_on_processes(self):
+        found = ConstraintSatisfaction.find_network(self._regulated(), self.sim, [self._regulation_mutable()],
+                                                    self.constraints, 60, processes=2)
+        self.assertEqual(self._regulators(found), ["C"])
+        self.assertLessEqual(ConstraintSatisfaction._evaluate_network(found, self.sim, self.constraints), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
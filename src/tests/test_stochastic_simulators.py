@@ -0,0 +1,69 @@
+import unittest
+from math import exp
+
+from models.formulae.degradation_formula import DegradationFormula
+from models.formulae.transcription_formula import TranscriptionFormula
+from models.network import Network
+from models.reaction import Reaction
+from models.simulation_settings import SimulationSettings
+from simulation.ensemble_runner import EnsembleRunner
+from simulation.gillespie_simulator import GillespieSimulator
+from simulation.stochastic_method import StochasticMethod
+
+
+class StochasticSimulatorsTest(unittest.TestCase):
+    BIRTH_RATE = 0.5
+    DEATH_RATE = 0.1
+    TIMES = [10, 20]
+    REPLICATES = 400
+
+    @staticmethod
+    def _birth_death():
+        # X is made at a constant rate and each molecule decays at DEATH_RATE
+        net = Network()
+        net.add_species("X", 0)
+        net.add_reaction(Reaction("birth", [], ["X"], TranscriptionFormula(StochasticSimulatorsTest.BIRTH_RATE, "X")))
+        net.add_reaction(Reaction("death", ["X"], [], DegradationFormula(StochasticSimulatorsTest.DEATH_RATE, "X")))
+        return net
+
+    @staticmethod
+    def _exact_mean(t):
+        test = StochasticSimulatorsTest
+        return test.BIRTH_RATE / test.DEATH_RATE * (1 - exp(-test.DEATH_RATE * t))
+
+    def _ensemble_mean(self, method):
+        sim = SimulationSettings(0, max(self.TIMES), 0, [], stochastic_method=method)
+        results = EnsembleRunner.run(self._birth_death(), sim, self.REPLICATES, seed=1, processes=1,
+                                     time_space=self.TIMES)
+        return results.mean[:, 0]
+
+    def _assert_exact_mean(self, method):
+        # The standard error of the mean is below 0.11 at every time
+        for t, mean in zip(self.TIMES, self._ensemble_mean(method)):
+            self.assertAlmostEqual(mean, self._exact_mean(t), delta=0.45)
+
+    def test_direct_mean(self):
+        self._assert_exact_mean(StochasticMethod.DIRECT)
+
+    def test_next_reaction_mean(self):
+        self._assert_exact_mean(StochasticMethod.NEXT_REACTION)
+
+    def test_engines_agree(self):
+        direct = self._ensemble_mean(StochasticMethod.DIRECT)
+        for method in [StochasticMethod.NEXT_REACTION, StochasticMethod.TAU_LEAPING]:
+            for expected, mean in zip(direct, self._ensemble_mean(method)):
+                self.assertAlmostEqual(mean, expected, delta=0.6)
+
+    def test_engines_stop_at_end_time(self):
+        for method in StochasticMethod:
+            sim = SimulationSettings(0, 7.5, 0, [], stochastic_method=method, seed=1)
+            results = GillespieSimulator.simulate(self._birth_death(), sim)
+            self.assertEqual(results.times[-1], 7.5, method)
+            self.assertTrue((results.times[:-1] < 7.5).all(), method)
+
+    def test_tau_leaping_mean(self):
+        self._assert_exact_mean(StochasticMethod.TAU_LEAPING)
+
+
+if __name__ == "__main__":
+    unittest.main()
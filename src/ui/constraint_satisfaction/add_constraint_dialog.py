@@ -4,6 +4,7 @@ from PyQt5.QtWidgets import QDialog, QLabel, QFormLayout, QLineEdit, QPushButton
 
 import helper
 from constraint_satisfaction.constraint import Constraint
+from constraint_satisfaction.value_constraint import UpperBound, LowerBound
 from ui import common_widgets
 from ui.gene_presenter import GenePresenter
 
@@ -29,9 +30,9 @@ class AddConstraintDialog(QDialog):
         t1 = float(self.time_ub.text())
 
         if sign == "<=":
-            cons = lambda v: v - value
+            cons = UpperBound(value)
         elif sign == ">=":
-            cons = lambda v: value - v
+            cons = LowerBound(value)
         else:
             helper.show_error_message("Constraint syntax error: Unrecognised sign")
             self.close()
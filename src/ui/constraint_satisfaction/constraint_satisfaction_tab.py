@@ -36,12 +36,17 @@ class ConstraintSatisfactionModifyTab(QWidget):
             t = ConstraintSatisfaction.find_network(
                 g.network, s, g.get_mutables(),
                 g.get_constraints(), give_up_time)
-        else:
+        elif self.method_combo.currentIndex() == 1:
             temperature = int(self.temperature_edit.text())
             schedule = ConstraintSatisfaction.generate_schedule(temperature)
             t = ConstraintSatisfaction.find_closest_network(
                 g.network, s, g.get_mutables(),
                 g.get_constraints(), schedule)
+        else:
+            iterations = int(self.iterations_edit.text())
+            t = ConstraintSatisfaction.find_optimal_network(
+                g.network, s, g.get_mutables(),
+                g.get_constraints(), iterations)
 
         if t:
             variables_dialog = QDialog()
@@ -107,17 +112,25 @@ class ConstraintSatisfactionModifyTab(QWidget):
         best_first_panel.setVisible(False)
         return best_first_panel
 
+    def _get_gradient_panel(self):
+        gradient_panel = QWidget()
+        self.iterations_edit = QLineEdit()
+        self.iterations_edit.setValidator(QIntValidator())
+        gradient_layout = QFormLayout()
+        gradient_layout.addRow(QLabel("Iterations (typical value 100)"), self.iterations_edit)
+        gradient_panel.setLayout(gradient_layout)
+        gradient_panel.setVisible(False)
+        return gradient_panel
+
     def _method_combo_index_changed(self):
-        if self.method_combo.currentIndex() == 0:
-            self.best_first_panel.setVisible(True)
-            self.annealing_panel.setVisible(False)
-        else:
-            self.best_first_panel.setVisible(False)
-            self.annealing_panel.setVisible(True)
+        index = self.method_combo.currentIndex()
+        self.best_first_panel.setVisible(index == 0)
+        self.annealing_panel.setVisible(index == 1)
+        self.gradient_panel.setVisible(index == 2)
 
     def _get_method_combo(self):
         self.method_combo = QComboBox()
-        self.method_combo.addItems(["Find exact match", "Find closest match"])
+        self.method_combo.addItems(["Find exact match", "Find closest match", "Find closest match (gradient)"])
         self.method_combo.currentIndexChanged.connect(self._method_combo_index_changed)
         return self.method_combo
 
@@ -132,11 +145,13 @@ class ConstraintSatisfactionModifyTab(QWidget):
 
         self.annealing_panel = self._get_annealing_panel()
         self.best_first_panel = self._get_best_first_panel()
+        self.gradient_panel = self._get_gradient_panel()
 
         run_options_box = QVBoxLayout()
         run_options_box.addLayout(mode_layout)
         run_options_box.addWidget(self.annealing_panel)
         run_options_box.addWidget(self.best_first_panel)
+        run_options_box.addWidget(self.gradient_panel)
         return run_options_box
 
     def _get_run_panel(self):
@@ -8,6 +8,8 @@ class GenePresenter:
         self.network = Network()
         self.mutables = []
         self.constraints = []
+        # key: mutable's variable name, value: index of the first such mutable in mutables
+        self._mutable_index = dict()
 
     @staticmethod
     def get_instance():
@@ -25,19 +27,24 @@ class GenePresenter:
         return self.mutables
 
     def get_mutable_by_name(self, name):
-        f = list(filter(
-            lambda m: m.variable_name == name,
-            self.mutables))
-        return f[0] if f else None
+        i = self._mutable_index.get(name)
+        if i is None or i >= len(self.mutables) or self.mutables[i].variable_name != name:
+            # Mutables are added to the list directly, so the index is rebuilt when found to be stale
+            self._mutable_index = dict()
+            for j, m in enumerate(self.mutables):
+                self._mutable_index.setdefault(m.variable_name, j)
+            i = self._mutable_index.get(name)
+
+        return self.mutables[i] if i is not None else None
 
     def get_constraints(self):
         return self.constraints
 
     def add_species(self, key, value):
-        self.network.species[key] = value
+        self.network.add_species(key, value)
 
     def add_reaction(self, reaction):
-        self.network.reactions.append(reaction)
+        self.network.add_reaction(reaction)
 
     def add_mutable(self, species, mutable):
         self.mutables[species] = mutable
@@ -46,14 +53,13 @@ class GenePresenter:
         self.constraints.append(constraint)
 
     def remove_species(self, name):
-        del self.network.species[name]
+        self.network.remove_species(name)
 
     def remove_reaction_by_name(self, name):
-        r = list(filter(lambda x: x.name == name, self.network.reactions))[0]
-        self.network.reactions.remove(r)
+        self.network.remove_reaction(self.network.get_reaction_by_name(name))
 
     def remove_reaction_by_index(self, index):
-        del self.network.reactions[index]
+        self.network.remove_reaction(self.network.reactions[index])
 
     def remove_mutable(self, index):
         del self.mutables[index]
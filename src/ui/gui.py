@@ -117,6 +117,9 @@ class GeneWindow(QMainWindow):
                 1. Exact match: Find a network which exactly matches the required network.
                 2. Closest match: If no network exactly satisfies all the constraints, 
                     finds a network which comes closest to satisfying all of them.
+                3. Closest match (gradient): As closest match, but varies the mutables continuously 
+                    within their bounds, following the gradient of how far the constraints are from
+                    being satisfied. Regulation mutables are kept as they are.
                 """
 
         user_manual_message.setText(user_manual)
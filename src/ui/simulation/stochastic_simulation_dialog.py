@@ -1,16 +1,29 @@
 import copy
 import threading
 
-from PyQt5.QtWidgets import QDialog, QVBoxLayout, QLabel, QFormLayout, QLineEdit, QPushButton
+from PyQt5.QtWidgets import QDialog, QVBoxLayout, QLabel, QFormLayout, QLineEdit, QPushButton, QComboBox
 
 import helper
 from models.simulation_settings import SimulationSettings
 from simulation.gillespie_simulator import GillespieSimulator
+from simulation.recording_policy import RecordingPolicy
+from simulation.stochastic_method import StochasticMethod
 from ui import common_widgets
 from ui.gene_presenter import GenePresenter
 
 
 class StochasticSimulationDialog(QDialog):
+    # Options of the method combo box, in order
+    METHODS = [("Direct method", StochasticMethod.DIRECT),
+               ("Next reaction method", StochasticMethod.NEXT_REACTION),
+               ("Tau-leaping", StochasticMethod.TAU_LEAPING)]
+    # Options of the recording combo box, in order
+    RECORDINGS = [("Every event", RecordingPolicy.ALL),
+                  ("Changes to shown species", RecordingPolicy.CHANGES),
+                  ("Evenly spaced points", RecordingPolicy.GRID)]
+    # Number of points recorded with RecordingPolicy.GRID
+    GRID_POINTS = 1000
+
     def _ok_button_clicked(self):
         time_text = self.time_field.text().strip()
 
@@ -24,9 +37,15 @@ class StochasticSimulationDialog(QDialog):
 
         self.close()
 
-        # Precision field does not apply to stochastic simulation!
-        s = SimulationSettings(0, end_time, 0, [s.strip() for s in species])
-        sim_net = copy.deepcopy(GenePresenter.get_instance().network)
+        # Precision field does not apply to stochastic simulation, other than for the recording grid
+        method = StochasticSimulationDialog.METHODS[self.method_combo.currentIndex()][1]
+        recording = StochasticSimulationDialog.RECORDINGS[self.recording_combo.currentIndex()][1]
+        precision = StochasticSimulationDialog.GRID_POINTS if recording == RecordingPolicy.GRID else 0
+        s = SimulationSettings(0, end_time, precision, [s.strip() for s in species],
+                               stochastic_method=method, recording=recording)
+        # Stochastic simulation only replaces the species of the network it is given, so a shallow copy
+        # keeps the presenter's network unchanged without copying its reactions
+        sim_net = copy.copy(GenePresenter.get_instance().network)
 
         def do_simulation():
             GillespieSimulator.visualise(GillespieSimulator.simulate(sim_net, s), s)
@@ -44,6 +63,14 @@ class StochasticSimulationDialog(QDialog):
         self.time_field.setValidator(helper.get_double_validator())
         fields.addRow(QLabel("Simulation time"), self.time_field)
 
+        self.method_combo = QComboBox()
+        self.method_combo.addItems([name for name, _ in StochasticSimulationDialog.METHODS])
+        fields.addRow(QLabel("Method"), self.method_combo)
+
+        self.recording_combo = QComboBox()
+        self.recording_combo.addItems([name for name, _ in StochasticSimulationDialog.RECORDINGS])
+        fields.addRow(QLabel("Record"), self.recording_combo)
+
         self.species_checkboxes = common_widgets.make_species_checkboxes_layout()
 
         self.ok_button = QPushButton("Ok")